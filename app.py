@@ -3,39 +3,69 @@
 #----------------------------------------------------------------------------#
 
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from flask import Flask, Blueprint, current_app, render_template, request, Response, flash, redirect, url_for, \
+  abort, stream_template, stream_with_context
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import event, DDL
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm.exc import StaleDataError
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
+from forms import VenueForm, ArtistForm, ShowForm, ShowBatchForm
+from filters import format_datetime, cached_format_datetime
+from cache import Cache
+from template_cache import TemplateCache
+from assets import Assets
+import pool_metrics
+from profiling import Profiler
+import bulk
+from counters import ShowCounters
+from areas import AreaDirectory
+from partitions import ShowPartitions
+from archive import Archive, archive_table
+from async_db import AsyncDB
+from lazy_migrate import LazyMigrate
 
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# extensions are created unbound and set up by create_app() (see the end of
+# this module), so importing it builds no app and opens nothing
+db = SQLAlchemy()
+moment = Moment()
+migrate = LazyMigrate()
+cache = Cache()
+profiler = Profiler()
+async_db = AsyncDB()
+template_cache = TemplateCache()
+assets = Assets()
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+# genres are stored as a native array on PostgreSQL (GIN-indexed, see the
+# migration) and as a JSON list where arrays are not available
+Genres = ARRAY(db.String).with_variant(db.JSON(), 'sqlite')
+
 class Venue(db.Model):
     __tablename__ = 'venue'
+    __table_args__ = (
+        db.Index('ix_venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_venue_state_city', 'state', 'city'),
+        db.Index('ix_venue_genres', 'genres', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     seeking = db.Column(db.Boolean, nullable=False, default=False)
     seeking_message = db.Column(db.String(500))
-    genres = db.Column(db.String, nullable=False)
+    genres = db.Column(Genres, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
@@ -43,134 +73,235 @@ class Venue(db.Model):
     website_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500), nullable=False)
     facebook_link = db.Column(db.String(120))
-    shows = db.relationship('Show', backref='venue', lazy=True)
+    # maintained by ShowCounters, see counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # bumped by every ORM update, which only applies WHERE it is still the
+    # version that was read; see edit_venue_submission
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # shows go with their venue through ON DELETE CASCADE, without being loaded
+    shows = db.relationship('Show', backref='venue', lazy=True, cascade='all, delete', passive_deletes=True)
+
+    __mapper_args__ = {'version_id_col': version}
 
 class Artist(db.Model):
     __tablename__ = 'artist'
+    __table_args__ = (
+        db.Index('ix_artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_artist_genres', 'genres', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     seeking = db.Column(db.Boolean, nullable=False, default=False)
     seeking_message = db.Column(db.String(500))
-    genres = db.Column(db.String, nullable=False)
+    genres = db.Column(Genres, nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False)
     website_link = db.Column(db.String(120))
     image_link = db.Column(db.String(500), nullable=False)
     facebook_link = db.Column(db.String(120))
-    shows = db.relationship('Show', backref='artist', lazy=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    shows = db.relationship('Show', backref='artist', lazy=True, cascade='all, delete', passive_deletes=True)
+
+    __mapper_args__ = {'version_id_col': version}
 
 class Show(db.Model):
     __tablename__ = 'show'
+    __table_args__ = (
+        db.Index('ix_show_venue_id_date', 'venue_id', 'date'),
+        db.Index('ix_show_artist_id_date', 'artist_id', 'date'),
+        db.Index('ix_show_date', 'date'),
+    )
 
+    # on PostgreSQL the partitioned table's primary key is (id, date), see the
+    # partition_show_by_month migration; ids still come from one sequence, so
+    # id alone identifies a show and stays the mapped key. SQLite keeps id as
+    # its INTEGER PRIMARY KEY, which a composite key would stop autoincrementing.
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime(timezone=False), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
 
-#----------------------------------------------------------------------------#
-# Filters.
-#----------------------------------------------------------------------------#
-
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+class ShowCounterState(db.Model):
+    # single row holding the instant up to which the show counters have been
+    # rolled over from upcoming to past
+    __tablename__ = 'show_counter_state'
 
-app.jinja_env.filters['datetime'] = format_datetime
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_over_at = db.Column(db.DateTime(timezone=False), nullable=False)
+
+class Area(db.Model):
+    # materialized city/state directory, maintained by AreaDirectory (see
+    # areas.py) so /venues pages through areas without grouping every venue
+    __tablename__ = 'area'
+
+    state = db.Column(db.String(120), primary_key=True)
+    city = db.Column(db.String(120), primary_key=True)
+    num_venues = db.Column(db.Integer, nullable=False, default=0)
+    num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+
+# deleted (with ARCHIVE_DELETED) and old rows, moved there by Archive, see
+# archive.py
+for table in (Venue.__table__, Artist.__table__, Show.__table__):
+    archive_table(table)
+
+# name search is backed by trigram indexes on PostgreSQL (see the migration)
+# and by FTS5 tables kept in sync through triggers on SQLite
+event.listen(db.metadata, 'before_create', DDL(
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm'
+).execute_if(dialect='postgresql'))
+
+for table in (Venue.__table__, Artist.__table__):
+    for statement in [
+        "CREATE VIRTUAL TABLE %(table)s_fts USING fts5("
+        "name, content='%(table)s', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER %(table)s_fts_insert AFTER INSERT ON %(table)s BEGIN "
+        "INSERT INTO %(table)s_fts(rowid, name) VALUES (new.id, new.name); END",
+        "CREATE TRIGGER %(table)s_fts_delete AFTER DELETE ON %(table)s BEGIN "
+        "INSERT INTO %(table)s_fts(%(table)s_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+        "CREATE TRIGGER %(table)s_fts_update AFTER UPDATE OF name ON %(table)s BEGIN "
+        "INSERT INTO %(table)s_fts(%(table)s_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+        "INSERT INTO %(table)s_fts(rowid, name) VALUES (new.id, new.name); END",
+    ]:
+        event.listen(table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(table, 'before_drop', DDL(
+        'DROP TABLE IF EXISTS %(table)s_fts'
+    ).execute_if(dialect='sqlite'))
+
+area_directory = AreaDirectory()
+show_counters = ShowCounters()
+show_partitions = ShowPartitions()
+archive = Archive()
+
+def on_shows_insert(rows):
+  changes = show_counters.add((row['venue_id'], row['artist_id'], row['date']) for row in rows)
+  area_directory.add_shows(changes['venue'])
+
+def on_shows_remove(*conditions):
+  # before the shows matching the conditions are deleted, in the same
+  # transaction; counted in the database rather than loaded
+  area_directory.add_shows(show_counters.remove_matching(*conditions)['venue'])
+
+BULK_ENTITIES = {
+    'venues': bulk.Entity(Venue, VenueForm, [
+        'name', 'seeking', 'seeking_message', 'genres', 'city', 'state', 'address', 'phone',
+        'website_link', 'image_link', 'facebook_link'
+    ], 'venue', on_insert=lambda rows: area_directory.add_venues((row['state'], row['city'], 0) for row in rows)),
+    'artists': bulk.Entity(Artist, ArtistForm, [
+        'name', 'seeking', 'seeking_message', 'genres', 'city', 'state', 'phone',
+        'website_link', 'image_link', 'facebook_link'
+    ], 'artist'),
+    'shows': bulk.Entity(Show, ShowForm, ['artist_id', 'venue_id', 'date'], 'show',
+                         resolve=bulk.resolve_show_references, on_insert=on_shows_insert),
+}
 
 #----------------------------------------------------------------------------#
-# Controllers.
+# Queries.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
-def index():
-  return render_template('pages/home.html')
-
-
-#  Venues
-#  ----------------------------------------------------------------
-
-@app.route('/venues')
-def venues():
-  data, locations = [], []
-  venues = Venue.query.all()
-
-  # add to a list unique combinations of city-state
-  for venue in venues:
-    if venue.city + "-" + venue.state not in locations:
-      locations.append(venue.city + "-" + venue.state)
-
-  # add the combinations of city-state to the data list
-  # removing the dash used to concatenate in previous step
-  for location in locations:
-    data.append({
-      "city": location.split("-")[0],
-      "state": location.split("-")[1],
-      "venues": []
-    })
-
-  for venue in venues:
-    shows = Show.query.filter_by(venue_id=venue.id).all()
-    num_shows = 0
-
-    # check if show is upcoming or past based on today's date
-    for show in shows:
-      if show.date > datetime.now():
-        num_shows += 1
-
-    # add venue details to dict within data to be given to view
-    for item in data:
-      if venue.city == item['city'] and venue.state == item['state']:
-        item['venues'].append({
-          "id": venue.id,
-          "name": venue.name,
-          "num_upcoming_shows": num_shows
-        })
-
-  return render_template('pages/venues.html', areas=data)
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-  search_term = request.form.get('search_term', '')
-
-  # filter data containing search term
-  venues = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()
-  response = {
-    "count": 0,
-    "data": []
-  }
-
-  data = {}
-  for venue in venues:
-    upcoming_shows = 0
-    shows = Show.query.filter_by(venue_id=venue.id).all()
+def has_genre(model, genre):
+  # filter for rows listing the given genre
+  if db.session.get_bind().dialect.name == 'postgresql':
+    # genres @> ARRAY[genre] is answered by the GIN index
+    return model.genres.contains([genre])
+  values = db.func.json_each(model.genres).table_valued('value')
+  return db.select(values.c.value).where(values.c.value == genre).exists()
+
+def venue_areas(genre=None):
+  # one row per venue with its upcoming show counter, ordered so that venues
+  # of the same city-state come out next to each other
+  statement = db.select(
+      Venue.id, Venue.name, Venue.city, Venue.state, Venue.upcoming_shows_count.label('num_upcoming_shows')
+    )
+  if genre:
+    statement = statement.where(has_genre(Venue, genre))
 
-    # check if show is upcoming or past based on today's date
-    for show in shows:
-      if show.date > datetime.now():
-        upcoming_shows += 1
+  return statement.order_by(
+      Venue.state, Venue.city, Venue.id
+    )
 
-    data["id"] = venue.id
-    data["name"] = venue.name
-    data["num_upcoming_shows"] = upcoming_shows
+def area_page(cursor=None, per_page=None):
+  # areas of the directory in (state, city) order, keyset paginated like
+  # shows_page with one extra row to tell whether there is a next page
+  statement = db.select(Area).order_by(Area.state, Area.city)
+  if cursor is not None:
+    statement = statement.where(db.tuple_(Area.state, Area.city) > cursor)
+  return statement.limit((per_page or current_app.config['AREAS_PER_PAGE']) + 1)
+
+def area_venues(first, last):
+  # venues of every area from first to last (inclusive (state, city) pairs),
+  # a single range scan of ix_venue_state_city
+  return db.select(
+      Venue.id, Venue.name, Venue.city, Venue.state, Venue.upcoming_shows_count.label('num_upcoming_shows')
+    ).where(
+      db.tuple_(Venue.state, Venue.city).between(first, last)
+    ).order_by(
+      Venue.state, Venue.city, Venue.id
+    )
 
-    response["data"].append(data)
-    response["count"] += 1
+def encode_area_cursor(area):
+  return '%s/%s' % area
+
+def decode_area_cursor(value):
+  # states never contain a slash, cities may
+  state, slash, city = value.partition('/')
+  if not slash:
+    abort(400)
+  return state, city
+
+def listing(model, genre=None):
+  # venues or artists in id order with their upcoming show counter, for the
+  # API listings and their id cursors
+  statement = db.select(
+      model.id, model.name, model.city, model.state, model.genres, model.image_link,
+      model.upcoming_shows_count.label('num_upcoming_shows')
+    ).order_by(
+      model.id
+    )
+  if genre:
+    statement = statement.where(has_genre(model, genre))
+  return statement
+
+def venue_shows(venue_id):
+  # shows of a venue joined with the artist playing them, in date order and
+  # flagged as upcoming in SQL so the page needs no lookup per show. Like the
+  # other statement builders below it is run by both db.session and async_db
+  return db.select(
+      Show.artist_id, Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link'),
+      Show.date, (Show.date > datetime.now()).label('upcoming')
+    ).join(
+      Artist, Show.artist_id == Artist.id
+    ).where(
+      Show.venue_id == venue_id
+    ).order_by(
+      Show.date, Show.id
+    )
 
-  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+def artist_shows(artist_id):
+  # same as venue_shows, from the artist's side
+  return db.select(
+      Show.venue_id, Venue.name.label('venue_name'), Venue.image_link.label('venue_image_link'),
+      Show.date, (Show.date > datetime.now()).label('upcoming')
+    ).join(
+      Venue, Show.venue_id == Venue.id
+    ).where(
+      Show.artist_id == artist_id
+    ).order_by(
+      Show.date, Show.id
+    )
 
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-  venue = Venue.query.filter_by(id=venue_id).first()
+def venue_detail(venue, shows):
+  # everything show_venue.html renders from a venue and its venue_shows rows,
+  # shared with the API
   data={
     "id": venue.id,
     "name": venue.name,
-    "genres": venue.genres[1:-1].replace('"', '').split(","),
+    "genres": venue.genres,
     "address": venue.address,
     "city": venue.city,
     "state": venue.state,
@@ -186,36 +317,430 @@ def show_venue(venue_id):
     "past_shows": []
   }
 
-  # populate and loop thru shows in given venue to populate upcoming + past shows feature
-  shows = Show.query.filter_by(venue_id=venue.id).all()
+  # populate upcoming + past shows feature from a single joined query
   for show in shows:
-    artist = Artist.query.filter_by(id=show.artist_id).first()
     show_info = {
-      "artist_id": artist.id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": str(show.date)
+      "artist_id": show.artist_id,
+      "artist_name": show.artist_name,
+      "artist_image_link": show.artist_image_link,
+      "start_time": show.date
     }
 
-    # check if show is upcoming or past based on today's date
-    if show.date > datetime.now():
+    if show.upcoming:
       data["upcoming_shows"].append(show_info)
-      data["upcoming_shows_count"] += 1
     else:
       data["past_shows"].append(show_info)
-      data["past_shows_count"] += 1
 
-  return render_template('pages/show_venue.html', venue=data)
+  data["upcoming_shows_count"] = len(data["upcoming_shows"])
+  data["past_shows_count"] = len(data["past_shows"])
+
+  return data
+
+def artist_detail(artist, shows):
+  # same as venue_detail, from an artist and its artist_shows rows
+  data = {
+    "id": artist.id,
+    "name": artist.name,
+    "genres": artist.genres,
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "website": artist.website_link,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking,
+    "seeking_description": artist.seeking_message,
+    "image_link": artist.image_link,
+    "past_shows_count": 0,
+    "upcoming_shows_count": 0,
+    "upcoming_shows": [],
+    "past_shows": []
+  }
+
+  # shows come with their venue already joined and flagged as upcoming or past
+  for show in shows:
+    show_info = {
+      "venue_id": show.venue_id,
+      "venue_name": show.venue_name,
+      "venue_image_link": show.venue_image_link,
+      "start_time": show.date
+    }
+
+    if show.upcoming:
+      data["upcoming_shows"].append(show_info)
+    else:
+      data["past_shows"].append(show_info)
+
+  data["upcoming_shows_count"] = len(data["upcoming_shows"])
+  data["past_shows_count"] = len(data["past_shows"])
+
+  return data
+
+def show_listing():
+  # only the columns shows.html renders, venue and artist joined in
+  return db.select(
+      Show.id, Show.date, Show.venue_id, Venue.name.label('venue_name'), Show.artist_id,
+      Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link')
+    ).join(
+      Venue, Show.venue_id == Venue.id
+    ).join(
+      Artist, Show.artist_id == Artist.id
+    ).order_by(
+      Show.date, Show.id
+    )
+
+def shows_page(cursor=None, per_page=None):
+  # keyset pagination: seek past the (date, id) of the last show already seen
+  # instead of using OFFSET, so every page costs the same whatever its depth.
+  # One extra row is fetched to know whether there is a next page, see
+  # split_page
+  statement = show_listing()
+  if cursor is not None:
+    statement = statement.where(db.tuple_(Show.date, Show.id) > cursor)
+  return statement.limit((per_page or current_app.config['SHOWS_PER_PAGE']) + 1)
+
+def split_page(rows, per_page=None):
+  # (rows of the page, cursor of the next page or None)
+  per_page = per_page or current_app.config['SHOWS_PER_PAGE']
+  next_cursor = (rows[per_page - 1].date, rows[per_page - 1].id) if len(rows) > per_page else None
+  return rows[:per_page], next_cursor
+
+def encode_cursor(cursor):
+  date, show_id = cursor
+  return '%s_%d' % (date.isoformat(), show_id)
+
+def decode_cursor(value):
+  try:
+    date, show_id = value.rsplit('_', 1)
+    return datetime.fromisoformat(date), int(show_id)
+  except ValueError:
+    abort(400)
+
+def date_arg(name, default=None):
+  value = request.args.get(name)
+  if not value:
+    return default
+  try:
+    return datetime.fromisoformat(value)
+  except ValueError:
+    abort(400, 'invalid %s date' % name)
+
+def filter_shows(statement, start=None, end=None):
+  # narrows a show_listing() statement to the date window [start, end) and to
+  # the venue_id, artist_id, city, state and genre (of the artist) arguments
+  # of the request. A bounded window is a range scan of ix_show_date, and on
+  # PostgreSQL only touches the monthly partitions it overlaps (see the
+  # partition_show_by_month migration).
+  if start is not None:
+    statement = statement.where(Show.date >= start)
+  if end is not None:
+    statement = statement.where(Show.date < end)
+  for name, column in (('venue_id', Show.venue_id), ('artist_id', Show.artist_id)):
+    if name in request.args:
+      value = request.args.get(name, type=int)
+      if value is None:
+        abort(400, 'invalid %s' % name)
+      statement = statement.where(column == value)
+  for name, column in (('city', Venue.city), ('state', Venue.state)):
+    if request.args.get(name):
+      statement = statement.where(column == request.args[name])
+  if request.args.get('genre'):
+    statement = statement.where(has_genre(Artist, request.args['genre']))
+  return statement
+
+def calendar_bucket(bucket):
+  # first day of the day or (Monday-based) week each show falls in
+  if db.session.get_bind().dialect.name == 'postgresql':
+    return db.cast(db.func.date_trunc(bucket, Show.date), db.Date)
+  if bucket == 'week':
+    return db.func.date(Show.date, 'weekday 0', '-6 days', type_=db.Date)
+  return db.func.date(Show.date, type_=db.Date)
+
+def show_calendar(statement, bucket):
+  # (start, count) of every day or week of a filter_shows() statement that
+  # has shows, in date order. The listing's own ORDER BY goes: PostgreSQL
+  # refuses to order groups by show.date, which is not grouped.
+  start = calendar_bucket(bucket).label('start')
+  return statement.with_only_columns(
+      start, db.func.count(Show.id).label('count')
+    ).group_by(
+      start
+    ).order_by(
+      None
+    ).order_by(
+      start
+    )
+
+def check_version(row, form):
+  # an edit applies to the version its form was filled from; a form without
+  # one (an older page) edits whatever is current. Edits racing between the
+  # read and the UPDATE are caught by version_id_col on flush.
+  if form.version.data and int(form.version.data) != row.version:
+    raise StaleDataError('%s %d is at version %d, the form was filled from version %s'
+                         % (row.__tablename__, row.id, row.version, form.version.data))
+
+def delete_rows(model, ids):
+  # deletes the venues or artists with these ids in a fixed number of
+  # set-based statements, their shows going with them through ON DELETE
+  # CASCADE; archived first with ARCHIVE_DELETED. Returns the ids that
+  # existed; the caller commits.
+  ids = set(ids)
+  shows = (Show.venue_id if model is Venue else Show.artist_id).in_(ids)
+  on_shows_remove(shows)
+  archive.deleting(Show.__table__, shows)
+  archive.deleting(model.__table__, model.id.in_(ids))
+  if model is not Venue:
+    return db.session.scalars(db.delete(model).where(model.id.in_(ids)).returning(model.id)).all()
+  # the deleted venues leave their areas as they are at the DELETE
+  deleted = db.session.execute(db.delete(Venue).where(Venue.id.in_(ids)).returning(
+    Venue.id, Venue.state, Venue.city, Venue.upcoming_shows_count
+  )).all()
+  area_directory.remove_venues((state, city, upcoming) for id, state, city, upcoming in deleted)
+  return [id for id, state, city, upcoming in deleted]
+
+def delete_one(model, id, *namespaces):
+  # the DELETE of a venue or artist page, answered in JSON for the page's
+  # script; the flashed message shows on the page it goes to next
+  name = db.session.scalar(db.select(model.name).where(model.id == id))
+  if name is None:
+    abort(404)
+
+  try:
+    delete_rows(model, [id])
+    db.session.commit()
+    cache.invalidate(*namespaces)
+    flash('%s %s was successfully removed from the system.' % (model.__name__, name))
+  except:
+    db.session.rollback()
+    flash('An error occurred. %s %s was not removed from the system.' % (model.__name__, name))
+    return {"success": False}, 500
+  finally:
+    db.session.close()
+
+  return {"success": True, "redirect": url_for('main.index')}
+
+def show_entry(number, artist_id, venue_id, start_time):
+  # (number, artist_id, venue_id, start_time) of one show of a batch, raises
+  # ValueError when a value does not parse
+  start_time = start_time if isinstance(start_time, datetime) else datetime.fromisoformat(str(start_time).strip())
+  return number, int(artist_id), int(venue_id), start_time
+
+def schedule_shows(entries):
+  # inserts a batch of show_entry() tuples, all of them or none. Referenced
+  # artists and venues are checked with one IN query each, and venue slots
+  # already booked (or booked twice by the batch) with one more; then every
+  # show goes in with a single batched INSERT ... RETURNING. Returns (ids in
+  # entry order, {number: error}); the caller commits.
+  errors = {}
+  for name, model, index in (('artist_id', Artist, 1), ('venue_id', Venue, 2)):
+    referenced = set(entry[index] for entry in entries)
+    known = set(db.session.scalars(db.select(model.id).where(model.id.in_(referenced))))
+    for entry in entries:
+      if entry[index] not in known:
+        errors.setdefault(entry[0], 'unknown %s %d' % (name, entry[index]))
+
+  slots = {}
+  for number, artist_id, venue_id, start_time in entries:
+    slots.setdefault((venue_id, start_time), []).append(number)
+  taken = set(map(tuple, db.session.execute(
+    db.select(Show.venue_id, Show.date).where(db.tuple_(Show.venue_id, Show.date).in_(list(slots)))
+  )))
+  for (venue_id, start_time), numbers in slots.items():
+    if (venue_id, start_time) in taken:
+      error = 'venue %d already has a show at %s' % (venue_id, start_time)
+    elif len(numbers) > 1:
+      error = 'venue %d is booked more than once at %s' % (venue_id, start_time)
+    else:
+      continue
+    for number in numbers:
+      errors.setdefault(number, error)
+  if errors:
+    return [], errors
+
+  rows = [
+    {'artist_id': artist_id, 'venue_id': venue_id, 'date': start_time}
+    for number, artist_id, venue_id, start_time in entries
+  ]
+  # RETURNING order is not guaranteed across the batched statements, the
+  # venue slot (unique within the batch by now) maps ids back to entries
+  inserted = db.session.execute(db.insert(Show).returning(Show.venue_id, Show.date, Show.id), rows)
+  ids = dict(((venue_id, start_time), id) for venue_id, start_time, id in inserted)
+  on_shows_insert(rows)
+  return [ids[(row['venue_id'], row['date'])] for row in rows], {}
+
+def search(model, term, limit=None, offset=0):
+  # ranked name search returning (id, name, num_upcoming_shows, total) rows,
+  # where total is the number of matches before LIMIT/OFFSET; each backend
+  # uses its own name index
+  total = db.func.count().over().label('total')
+  query = db.session.query(
+      model.id, model.name, model.upcoming_shows_count.label('num_upcoming_shows'), total
+    )
+  dialect = db.session.get_bind().dialect.name
+
+  if dialect == 'postgresql':
+    # ILIKE is served by the gin_trgm_ops index, similarity() ranks the matches
+    query = query.filter(
+      model.name.ilike(f'%{term}%')
+    ).order_by(
+      db.func.similarity(model.name, term).desc(), model.name
+    )
+  elif dialect == 'sqlite' and len(term) >= 3:
+    # the trigram tokenizer needs at least three characters to match
+    fts = db.table(model.__tablename__ + '_fts', db.column('rowid'), db.column('rank'))
+    query = query.join(
+      fts, fts.c.rowid == model.id
+    ).filter(
+      db.text(f'{fts.name} MATCH :term').bindparams(term='"%s"' % term.replace('"', '""'))
+    ).order_by(
+      fts.c.rank, model.name
+    )
+  else:
+    query = query.filter(model.name.ilike(f'%{term}%')).order_by(model.name)
+
+  # matches rank on the name and show the upcoming show counter
+  return cache.fetch(
+    'query:search:%s:%s:%d:%s' % (model.__tablename__, limit, offset, term),
+    lambda: query.limit(limit).offset(offset).all(), [model.__tablename__, 'show']
+  )
+
+def list_rows(statement):
+  # rows of a list page; a streamed page reads them through a server-side
+  # cursor, STREAM_BATCH_SIZE at a time, while it is being sent
+  if current_app.config['STREAM_LIST_PAGES']:
+    return db.session.execute(statement.execution_options(yield_per=current_app.config['STREAM_BATCH_SIZE']))
+  return db.session.execute(statement).all()
+
+def cached_rows(name, statement, *depends_on):
+  # list_rows() kept by the query cache under name, so a page cache miss
+  # (another page of the same data, a pending flash) does not run the query
+  # again; streamed pages keep reading from the cursor
+  if current_app.config['STREAM_LIST_PAGES']:
+    return list_rows(statement)
+  return cache.fetch('query:' + name, lambda: list_rows(statement), depends_on)
+
+def group_areas(rows):
+  # rows come back ordered by state/city, so consecutive venues share an area
+  for (state, city), venues in groupby(rows, lambda row: (row.state, row.city)):
+    yield {
+      "city": city,
+      "state": state,
+      "venues": [{
+        "id": venue.id,
+        "name": venue.name,
+        "num_upcoming_shows": venue.num_upcoming_shows
+      } for venue in venues]
+    }
+
+#----------------------------------------------------------------------------#
+# Streaming.
+#----------------------------------------------------------------------------#
+
+def chunked(pieces, size):
+  # jinja yields every bit of markup on its own, send them in chunks of about
+  # size characters instead
+  buffer, length = [], 0
+  for piece in pieces:
+    buffer.append(piece)
+    length += len(piece)
+    if length >= size:
+      yield ''.join(buffer)
+      buffer, length = [], 0
+  if buffer:
+    yield ''.join(buffer)
+
+def render_list(template_name, **context):
+  # with STREAM_LIST_PAGES the layout and the first rows go out while the
+  # rest are still read and rendered, and only one chunk of the page is ever
+  # held in memory. Streamed pages are not kept by the page cache.
+  if not current_app.config['STREAM_LIST_PAGES']:
+    return render_template(template_name, **context)
+  return Response(stream_with_context(
+    chunked(stream_template(template_name, **context), current_app.config['STREAM_BUFFER_SIZE'])
+  ))
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+def init_filters(app):
+  if app.config['DATETIME_FILTER_CACHE_SIZE']:
+    app.jinja_env.filters['datetime'] = cached_format_datetime(app.config['DATETIME_FILTER_CACHE_SIZE'])
+  else:
+    app.jinja_env.filters['datetime'] = format_datetime
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+main = Blueprint('main', __name__)
+
+@main.route('/')
+def index():
+  return render_template('pages/home.html')
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@main.route('/venues')
+@cache.cached_page('venue', 'show')
+def venues():
+  genre = request.args.get('genre')
+  next_page = None
+
+  if genre:
+    # filtered listings are grouped on the fly
+    rows = cached_rows('venue_areas:' + genre, venue_areas(genre), 'venue', 'show')
+  else:
+    # a page of areas from the directory, then their venues in one range scan
+    after = request.args.get('after')
+    per_page = current_app.config['AREAS_PER_PAGE']
+    areas = cache.fetch('query:areas:' + (after or ''), lambda: [
+      (area.state, area.city) for area in db.session.scalars(area_page(decode_area_cursor(after) if after else None))
+    ], ['venue', 'show'])
+    if len(areas) > per_page:
+      areas = areas[:per_page]
+      next_page = url_for('main.venues', after=encode_area_cursor(areas[-1]))
+    rows = cached_rows(
+      'area_venues:%s/%s:%s/%s' % (areas[0] + areas[-1]), area_venues(areas[0], areas[-1]), 'venue', 'show'
+    ) if areas else []
+
+  return render_list('pages/venues.html', areas=group_areas(rows), next_page=next_page)
+
+@main.route('/venues/search', methods=['POST'])
+def search_venues():
+  search_term = request.form.get('search_term', '')
+
+  # ranked, paginated matches for the search term
+  page = request.form.get('page', 1, type=int)
+  per_page = current_app.config['SEARCH_RESULTS_PER_PAGE']
+  venues = search(Venue, search_term, limit=per_page, offset=(page - 1) * per_page)
+  response = {
+    "count": venues[0].total if venues else 0,
+    "data": venues
+  }
+
+  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+
+@main.route('/venues/<int:venue_id>')
+@cache.cached_page('venue:{venue_id}', 'artist', 'show')
+def show_venue(venue_id):
+  # the venue and its shows are independent lookups, run concurrently on the
+  # async engine; the page is rendered back on this thread
+  venue, shows = async_db.gather(async_db.get(Venue, venue_id), async_db.all(venue_shows(venue_id)))
+  if venue is None:
+    abort(404)
+  return render_template('pages/show_venue.html', venue=venue_detail(venue, shows))
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
   try:
     form = VenueForm()
@@ -240,7 +765,9 @@ def create_venue_submission():
     )
 
     db.session.add(venue)
+    area_directory.add_venues([(state, city, 0)])
     db.session.commit()
+    cache.invalidate('venue')
 
     flash('Venue ' + request.form['name'] + ' was successfully listed!')
   except:
@@ -250,122 +777,60 @@ def create_venue_submission():
     db.session.close()
   return render_template('pages/home.html')
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@main.route('/venues/<int:venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
-  venue = Venue.query.filter_by(id=venue_id).first()
-  name = venue.name
-
-  try:
-    db.session.delete(venue)
-    db.session.commit()
-    flash('Venue ' + name + ' was successfully removed from the system.')
-  except:
-    db.session.rollback()
-    flash('An error occurred. Venue ' + name + ' was not removed from the system.')
-  finally:
-    db.session.close()
-
-  return None
+  return delete_one(Venue, venue_id, 'venue', 'venue:%s' % venue_id, 'show')
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@main.route('/artists')
+@cache.cached_page('artist')
 def artists():
-  data = []
-  artists = Artist.query.all()
+  statement = db.select(Artist.id, Artist.name).order_by(Artist.id)
+  if request.args.get('genre'):
+    statement = statement.where(has_genre(Artist, request.args['genre']))
 
-  # populates list of artists dicts
-  for artist in artists:
-    data.append({
-      "id": artist.id,
-      "name": artist.name,
-    })
+  # list of artists dicts, built as the template reaches them
+  data = ({
+    "id": artist.id,
+    "name": artist.name,
+  } for artist in list_rows(statement))
 
-  return render_template('pages/artists.html', artists=data)
+  return render_list('pages/artists.html', artists=data)
 
-@app.route('/artists/search', methods=['POST'])
+@main.route('/artists/search', methods=['POST'])
 def search_artists():
   search_term = request.form.get('search_term', '')
 
-  # filter results from artist entries that contain the search term
-  artists = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()
+  # ranked, paginated artist entries that contain the search term
+  page = request.form.get('page', 1, type=int)
+  per_page = current_app.config['SEARCH_RESULTS_PER_PAGE']
+  artists = search(Artist, search_term, limit=per_page, offset=(page - 1) * per_page)
   response = {
-    "count": 0,
-    "data": []
+    "count": artists[0].total if artists else 0,
+    "data": artists
   }
 
-  data = {}
-  for artist in artists:
-    upcoming_shows = 0
-    shows = Show.query.filter_by(artist_id=artist.id).all()
-
-    # loop through shows to feed the num of upcoming shows key in dict
-    # check to determine if the show has already happened based on current date
-    for show in shows:
-      if show.date > datetime.now():
-        upcoming_shows += 1
-
-    data["id"] = artist.id
-    data["name"] = artist.name
-    data["num_upcoming_shows"] = upcoming_shows
-
-    response["data"].append(data)
-    response["count"] += 1
-
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
-@app.route('/artists/<int:artist_id>')
+@main.route('/artists/<int:artist_id>')
+@cache.cached_page('artist:{artist_id}', 'venue', 'show')
 def show_artist(artist_id):
-  artist = Artist.query.filter_by(id=artist_id).first()
-  data = {
-    "id": artist.id,
-    "name": artist.name,
-    "genres": artist.genres[1:-1].replace('"', '').split(","),
-    "city": artist.city,
-    "state": artist.state,
-    "phone": artist.phone,
-    "website": artist.website_link,
-    "facebook_link": artist.facebook_link,
-    "seeking_venue": artist.seeking,
-    "seeking_description": artist.seeking_message,
-    "image_link": artist.image_link,
-    "past_shows_count": 0,
-    "upcoming_shows_count": 0,
-    "upcoming_shows": [],
-    "past_shows": []
-  }
-
-  # loop through shows to determine its category past or upcoming
-  shows = Show.query.filter_by(artist_id=artist_id).all()
-  for show in shows:
-    venue = Venue.query.filter_by(id=show.venue_id).first()
-    show_info = {
-      "venue_id": venue.id,
-      "venue_name": venue.name,
-      "venue_image_link": venue.image_link,
-      "start_time": str(show.date)
-    }
-
-    # check to determine if the show has already happened based on current date
-    if show.date > datetime.now():
-      data["upcoming_shows"].append(show_info)
-      data["upcoming_shows_count"] += 1
-    else:
-      data["past_shows"].append(show_info)
-      data["past_shows_count"] += 1
-
-  return render_template('pages/show_artist.html', artist=data)
+  artist, shows = async_db.gather(async_db.get(Artist, artist_id), async_db.all(artist_shows(artist_id)))
+  if artist is None:
+    abort(404)
+  return render_template('pages/show_artist.html', artist=artist_detail(artist, shows))
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   form = ArtistForm()
   data = Artist.query.filter_by(id=artist_id).first()
   artist = {
     "id": data.id,
     "name": data.name,
-    "genres": data.genres[1:-1].replace('"', '').split(','),
+    "genres": data.genres,
     "city": data.city,
     "state": data.state,
     "phone": data.phone,
@@ -374,6 +839,7 @@ def edit_artist(artist_id):
     "image_link": data.image_link,
     "seeking": data.seeking,
     "seeking_message": data.seeking_message,
+    "version": data.version,
   }
 
   # pre-populate the form with current values of these fields
@@ -385,11 +851,13 @@ def edit_artist(artist_id):
 
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
+  target = url_for('main.show_artist', artist_id=artist_id)
   try:
     form = ArtistForm()
     artist = Artist.query.filter_by(id=artist_id).first()
+    check_version(artist, form)
     artist.name = form.name.data
     artist.seeking = True if form.seeking.data == 'Yes' else False
     artist.seeking_message = form.seeking_message.data
@@ -401,17 +869,24 @@ def edit_artist_submission(artist_id):
     artist.image_link = form.image_link.data
     artist.facebook_link = form.facebook_link.data
 
+    # one UPDATE of the changed columns WHERE id and version still match
     db.session.commit()
+    cache.invalidate('artist', 'artist:%s' % artist_id)
     flash('Artist ' + request.form['name'] + ' was successfully updated!')
+  except StaleDataError:
+    db.session.rollback()
+    target = url_for('main.edit_artist', artist_id=artist_id)
+    flash('Artist ' + request.form['name'] + ' was changed by someone else in the meantime, your changes were '
+          'not saved. Here is the current version.')
   except:
     db.session.rollback()
     flash('An error occurred. Artist ' + request.form['name'] + ' could not be updated.')
   finally:
     db.session.close()
 
-  return redirect(url_for('show_artist', artist_id=artist_id))
+  return redirect(target)
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   form = VenueForm()
 
@@ -419,7 +894,7 @@ def edit_venue(venue_id):
   venue = {
     "id": data.id,
     "name": data.name,
-    "genres": data.genres[1:-1].replace('"', '').split(','),
+    "genres": data.genres,
     "city": data.city,
     "state": data.state,
     "address": data.address,
@@ -429,6 +904,7 @@ def edit_venue(venue_id):
     "image_link": data.image_link,
     "seeking": data.seeking,
     "seeking_message": data.seeking_message,
+    "version": data.version,
   }
 
   # pre-populate the form with current values of these fields
@@ -440,11 +916,15 @@ def edit_venue(venue_id):
 
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
+  target = url_for('main.show_venue', venue_id=venue_id)
   try:
     form = VenueForm()
     venue = Venue.query.filter_by(id=venue_id).first()
+    check_version(venue, form)
+    # the venue may move out of its area
+    old_area = (venue.state, venue.city)
     venue.name = form.name.data
     venue.seeking = True if form.seeking.data == 'Yes' else False
     venue.seeking_message = form.seeking_message.data
@@ -457,24 +937,36 @@ def edit_venue_submission(venue_id):
     venue.image_link = form.image_link.data
     venue.facebook_link = form.facebook_link.data
 
+    # one UPDATE of the changed columns WHERE id and version still match
+    db.session.flush()
+    if old_area != (venue.state, venue.city):
+      # read after the UPDATE, which waited for any show being added here
+      upcoming = db.session.scalar(db.select(Venue.upcoming_shows_count).where(Venue.id == venue_id))
+      area_directory.move_venue(old_area, (venue.state, venue.city), upcoming)
     db.session.commit()
+    cache.invalidate('venue', 'venue:%s' % venue_id)
     flash('Venue ' + request.form['name'] + ' was successfully updated!')
+  except StaleDataError:
+    db.session.rollback()
+    target = url_for('main.edit_venue', venue_id=venue_id)
+    flash('Venue ' + request.form['name'] + ' was changed by someone else in the meantime, your changes were '
+          'not saved. Here is the current version.')
   except:
     db.session.rollback()
     flash('An error occurred. Venue ' + request.form['name'] + ' could not be updated.')
   finally:
     db.session.close()
-  return redirect(url_for('show_venue', venue_id=venue_id))
+  return redirect(target)
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   try:
     form = ArtistForm()
@@ -499,6 +991,7 @@ def create_artist_submission():
 
     db.session.add(artist)
     db.session.commit()
+    cache.invalidate('artist')
 
     flash('Artist ' + request.form['name'] + ' was successfully listed!')
   except:
@@ -509,51 +1002,44 @@ def create_artist_submission():
   return render_template('pages/home.html')
 
 
-@app.route('/artists/<artist_id>', methods=['DELETE'])
+@main.route('/artists/<int:artist_id>', methods=['DELETE'])
 def delete_artist(artist_id):
-  artist = Artist.query.filter_by(id=artist_id).first()
-  name = artist.name
-
-  try:
-    db.session.delete(artist)
-    db.session.commit()
-    flash('Artist ' + name + ' was successfully removed from the system.')
-  except:
-    db.session.rollback()
-    flash('An error occurred. Artist ' + name + ' was not removed from the system.')
-  finally:
-    db.session.close()
-
-  return None
+  return delete_one(Artist, artist_id, 'artist', 'artist:%s' % artist_id, 'show')
 
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@main.route('/shows')
+@cache.cached_page('venue', 'artist', 'show')
 def shows():
   data = []
-  shows = Show.query.all()
+  after = request.args.get('after')
+  statement = filter_shows(shows_page(decode_cursor(after) if after else None), date_arg('from'), date_arg('to'))
+  rows, next_cursor = split_page(async_db.gather(async_db.all(statement))[0])
 
-  # loop through shows and pick-up relevant data from its related venue and artist
-  for show in shows:
+  # venue and artist details already come joined in each row
+  for show in rows:
     data.append({
       "venue_id": show.venue_id,
-      "venue_name": Venue.query.filter_by(id=show.venue_id).first().name,
+      "venue_name": show.venue_name,
       "artist_id": show.artist_id,
-      "artist_name": Artist.query.filter_by(id=show.artist_id).first().name,
-      "artist_image_link": Artist.query.filter_by(id=show.artist_id).first().image_link,
-      "start_time": format_datetime(str(show.date))
+      "artist_name": show.artist_name,
+      "artist_image_link": show.artist_image_link,
+      "start_time": show.date
     })
 
-  return render_template('pages/shows.html', shows=data)
+  # the next page keeps the date window and filters of this one
+  next_page = url_for('main.shows', **dict(request.args.to_dict(), after=encode_cursor(next_cursor))) \
+    if next_cursor else None
+  return render_list('pages/shows.html', shows=data, next_page=next_page)
 
-@app.route('/shows/create')
+@main.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
   try:
     form = ShowForm()
@@ -568,7 +1054,10 @@ def create_show_submission():
     )
 
     db.session.add(show)
+    changes = show_counters.add([(int(venue_id), int(artist_id), start_time)])
+    area_directory.add_shows(changes['venue'])
     db.session.commit()
+    cache.invalidate('show')
 
     flash('Show was successfully listed!')
   except:
@@ -578,24 +1067,350 @@ def create_show_submission():
     db.session.close()
   return render_template('pages/home.html')
 
-@app.errorhandler(404)
+@main.route('/shows/batch')
+def create_show_batch():
+  return render_template('forms/new_show_batch.html', form=ShowBatchForm())
+
+@main.route('/shows/batch', methods=['POST'])
+def create_show_batch_submission():
+  form = ShowBatchForm()
+  if not form.validate():
+    return render_template('forms/new_show_batch.html', form=form)
+
+  entries, errors = [], {}
+  for number, line in enumerate(form.shows.data.splitlines(), start=1):
+    if not line.strip():
+      continue
+    try:
+      entries.append(show_entry(number, *line.split(',')))
+    except (TypeError, ValueError):
+      errors[number] = 'expected "artist_id, venue_id, YYYY-MM-DD HH:MM"'
+  if len(entries) > current_app.config['SHOW_BATCH_MAX_SIZE']:
+    flash('At most %d shows can be listed at once.' % current_app.config['SHOW_BATCH_MAX_SIZE'])
+    return render_template('forms/new_show_batch.html', form=form)
+
+  try:
+    if not errors:
+      ids, errors = schedule_shows(entries)
+    if errors:
+      db.session.rollback()
+      return render_template('forms/new_show_batch.html', form=form, errors=sorted(errors.items()))
+    db.session.commit()
+    cache.invalidate('show')
+    flash('%d shows were successfully listed!' % len(ids))
+  except:
+    db.session.rollback()
+    flash('An error occurred. Shows could not be listed.')
+  finally:
+    db.session.close()
+  return render_template('pages/home.html')
+
+@main.route('/__cache')
+def cache_stats():
+  # hit/miss counters of this worker's cache, for monitoring
+  if not current_app.config['DIAGNOSTICS_PAGES']:
+    abort(404)
+  return cache.stats()
+
+@main.route('/__pool')
+def pool_stats():
+  # connection pool gauges, wait times and checkout latency histogram
+  if not current_app.config['DIAGNOSTICS_PAGES']:
+    abort(404)
+  return pool_metrics.metrics.snapshot(db.engine.pool)
+
+@main.route('/__perf')
+def perf_report():
+  # per-endpoint query counts, SQL/render times, slowest statements and N+1s
+  if 'profiler' not in current_app.extensions or not current_app.config['PROFILING_PAGE']:
+    abort(404)
+  return profiler.report()
+
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
+def init_foreign_keys(app):
+  # SQLite only enforces foreign keys, and so their ON DELETE CASCADE, on
+  # connections that turn them on
+  def on_connect(dbapi_connection, connection_record):
+    dbapi_connection.execute('PRAGMA foreign_keys = ON')
+
+  def attach(engine):
+    if engine.dialect.name == 'sqlite':
+      event.listen(engine, 'connect', on_connect)
+
+  pool_metrics.on_engine(app, db, attach)
+
+def init_logging(app):
+  if not app.debug:
+    # error.log is only opened once something is logged
+    file_handler = FileHandler('error.log', delay=True)
     file_handler.setFormatter(
         Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
     )
     app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+
+#----------------------------------------------------------------------------#
+# API.
+#----------------------------------------------------------------------------#
+
+# JSON mirror of the listing, detail and search pages for the mobile app.
+# Every endpoint takes ?fields=a,b to return only those keys; listings page
+# with ?cursor=/?limit= (keyset, like /shows) or stream the whole result as
+# a chunked array with ?stream=1; non-streamed responses carry an ETag.
+# /shows and /shows/calendar take a ?from=&to= window and venue_id, artist_id,
+# city, state and genre filters.
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+LISTING_FIELDS = ('id', 'name', 'city', 'state', 'genres', 'image_link', 'num_upcoming_shows')
+SHOW_FIELDS = ('id', 'date', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link')
+SEARCH_FIELDS = ('id', 'name', 'num_upcoming_shows')
+AREA_FIELDS = ('state', 'city', 'num_venues', 'num_upcoming_shows')
+CALENDAR_FIELDS = ('start', 'count')
+CALENDAR_BUCKETS = ('day', 'week')
+
+def to_json(value):
+  return json.dumps(value, default=_json_default, separators=(',', ':'))
+
+def _json_default(value):
+  if isinstance(value, (date, datetime)):
+    return value.isoformat()
+  raise TypeError('%r is not JSON serializable' % (value,))
+
+def selected_fields(available):
+  fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+  unknown = set(fields) - set(available)
+  if unknown:
+    abort(400, 'unknown fields: %s' % ', '.join(sorted(unknown)))
+  return fields or available
+
+def pick(row, fields):
+  return dict((field, row[field]) for field in fields)
+
+def conditional(body):
+  # a client sending back the ETag it already has gets an empty 304
+  response = current_app.response_class(body, mimetype='application/json')
+  response.add_etag()
+  return response.make_conditional(request)
+
+def streamed(rows, fields):
+  # the array is written one row at a time as the server-side cursor yields
+  # them, so neither the rows nor the body are ever held in memory whole
+  def generate():
+    yield '{"data":['
+    for i, row in enumerate(rows):
+      yield (',' if i else '') + to_json(pick(row._mapping, fields))
+    yield ']}'
+  return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def paginated(statement, fields, seek, cursor_of):
+  # seek(cursor) filters past the last row of the previous page and
+  # cursor_of(row) builds the cursor of the next one
+  fields = selected_fields(fields)
+  if request.args.get('cursor'):
+    statement = statement.where(seek(request.args['cursor']))
+
+  if request.args.get('stream') in ('1', 'true'):
+    return streamed(db.session.execute(
+      statement.execution_options(yield_per=current_app.config['API_STREAM_BATCH_SIZE'])
+    ), fields)
+
+  limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+  limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+  # one extra row tells whether there is a next page
+  rows = db.session.execute(statement.limit(limit + 1)).all()
+  next_cursor = cursor_of(rows[limit - 1]) if len(rows) > limit else None
+  return conditional(to_json({
+    "data": [pick(row._mapping, fields) for row in rows[:limit]],
+    "next_cursor": next_cursor
+  }))
+
+def id_cursor(model):
+  def seek(value):
+    if not value.isdigit():
+      abort(400, 'invalid cursor')
+    return model.id > int(value)
+  return seek
+
+def search_response(model):
+  fields = selected_fields(SEARCH_FIELDS)
+  page = max(request.args.get('page', 1, type=int), 1)
+  per_page = current_app.config['SEARCH_RESULTS_PER_PAGE']
+  rows = search(model, request.args.get('q', ''), limit=per_page, offset=(page - 1) * per_page)
+  return conditional(to_json({
+    "count": rows[0].total if rows else 0,
+    "page": page,
+    "data": [pick(row._mapping, fields) for row in rows]
+  }))
+
+def detail_response(data, fields):
+  return conditional(to_json(pick(data, selected_fields(fields))))
+
+@api.route('/venues')
+def api_venues():
+  return paginated(listing(Venue, request.args.get('genre')), LISTING_FIELDS, id_cursor(Venue), lambda row: str(row.id))
+
+@api.route('/venues/search')
+def api_search_venues():
+  return search_response(Venue)
+
+@api.route('/venues/<int:venue_id>')
+def api_show_venue(venue_id):
+  data = venue_detail(db.get_or_404(Venue, venue_id), db.session.execute(venue_shows(venue_id)).all())
+  return detail_response(data, tuple(data))
+
+@api.route('/artists')
+def api_artists():
+  return paginated(listing(Artist, request.args.get('genre')), LISTING_FIELDS, id_cursor(Artist), lambda row: str(row.id))
+
+@api.route('/artists/search')
+def api_search_artists():
+  return search_response(Artist)
+
+@api.route('/artists/<int:artist_id>')
+def api_show_artist(artist_id):
+  data = artist_detail(db.get_or_404(Artist, artist_id), db.session.execute(artist_shows(artist_id)).all())
+  return detail_response(data, tuple(data))
+
+@api.route('/areas')
+def api_areas():
+  return paginated(
+    db.select(Area.state, Area.city, Area.num_venues, Area.num_upcoming_shows).order_by(Area.state, Area.city),
+    AREA_FIELDS,
+    lambda value: db.tuple_(Area.state, Area.city) > decode_area_cursor(value),
+    lambda row: encode_area_cursor((row.state, row.city))
+  )
+
+@api.route('/shows')
+def api_shows():
+  return paginated(
+    filter_shows(show_listing(), date_arg('from'), date_arg('to')), SHOW_FIELDS,
+    lambda value: db.tuple_(Show.date, Show.id) > decode_cursor(value),
+    lambda row: encode_cursor((row.date, row.id))
+  )
+
+@api.route('/shows/calendar')
+def api_show_calendar():
+  # number of shows per day or week of a window, upcoming month by default;
+  # takes the filters of /api/v1/shows
+  bucket = request.args.get('bucket', 'day')
+  if bucket not in CALENDAR_BUCKETS:
+    abort(400, 'bucket must be one of %s' % ', '.join(CALENDAR_BUCKETS))
+  start = date_arg('from', datetime.combine(date.today(), datetime.min.time()))
+  end = date_arg('to', start + timedelta(days=current_app.config['CALENDAR_DEFAULT_DAYS']))
+  if not start < end <= start + timedelta(days=current_app.config['CALENDAR_MAX_DAYS']):
+    abort(400, 'the window must end after it starts and span at most %d days'
+          % current_app.config['CALENDAR_MAX_DAYS'])
+
+  fields = selected_fields(CALENDAR_FIELDS)
+  rows = db.session.execute(show_calendar(filter_shows(show_listing(), start, end), bucket)).all()
+  return conditional(to_json({
+    "from": start,
+    "to": end,
+    "bucket": bucket,
+    "data": [pick(row._mapping, fields) for row in rows]
+  }))
+
+@api.route('/shows/batch', methods=['POST'])
+def api_create_show_batch():
+  # body: a JSON list of {"artist_id", "venue_id", "start_time"} objects, all
+  # listed in one transaction or none of them; errors are keyed by position
+  # in the list, starting at 1
+  shows = request.get_json(silent=True)
+  if not isinstance(shows, list) or not shows:
+    abort(400, 'expected a non-empty JSON list of shows')
+  if len(shows) > current_app.config['SHOW_BATCH_MAX_SIZE']:
+    abort(400, 'at most %d shows per batch' % current_app.config['SHOW_BATCH_MAX_SIZE'])
+
+  entries, errors = [], {}
+  for number, show in enumerate(shows, start=1):
+    try:
+      entries.append(show_entry(number, show['artist_id'], show['venue_id'], show['start_time']))
+    except (KeyError, TypeError, ValueError):
+      errors[number] = 'expected artist_id, venue_id and an ISO 8601 start_time'
+  if not errors:
+    ids, errors = schedule_shows(entries)
+  if errors:
+    db.session.rollback()
+    return {"errors": [{"index": number, "error": error} for number, error in sorted(errors.items())]}, 400
+
+  db.session.commit()
+  cache.invalidate('show')
+  return {"data": [{"id": id} for id in ids]}, 201
+
+def api_delete(model, namespace):
+  # body: {"ids": [...]}, deleted together in one transaction whatever their
+  # number of shows; answers with the ids deleted and those that were not
+  # there
+  body = request.get_json(silent=True)
+  ids = body.get('ids') if isinstance(body, dict) else None
+  if not isinstance(ids, list) or not ids or \
+     not all(isinstance(id, int) and not isinstance(id, bool) for id in ids):
+    abort(400, 'expected {"ids": [...]} with a non-empty list of integer ids')
+  if len(ids) > current_app.config['DELETE_MAX_IDS']:
+    abort(400, 'at most %d ids per request' % current_app.config['DELETE_MAX_IDS'])
+
+  deleted = delete_rows(model, ids)
+  db.session.commit()
+  cache.invalidate(namespace, 'show', *['%s:%d' % (namespace, id) for id in deleted])
+  return {"deleted": sorted(deleted), "missing": sorted(set(ids) - set(deleted))}
+
+@api.route('/venues', methods=['DELETE'])
+def api_delete_venues():
+  return api_delete(Venue, 'venue')
+
+@api.route('/artists', methods=['DELETE'])
+def api_delete_artists():
+  return api_delete(Artist, 'artist')
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+  return {"error": error.description}, error.code
+
+#----------------------------------------------------------------------------#
+# App Factory.
+#----------------------------------------------------------------------------#
+
+def create_app(config='config'):
+  # `flask` finds this on its own; servers use asgi.application or call it
+  app = Flask(__name__)
+  app.config.from_object(config)
+
+  pool_metrics.configure(app)
+  db.init_app(app)
+  pool_metrics.init_app(app, db)
+  init_foreign_keys(app)
+  moment.init_app(app)
+  migrate.init_app(app, db)
+  cache.init_app(app)
+  if app.config['PROFILING_ENABLED']:
+    profiler.init_app(app, db)
+  # after the profiler, which also watches the async engine
+  async_db.init_app(app)
+  area_directory.init_app(app, db, Venue, Area)
+  # areas sum the upcoming show counters, so they follow every recount
+  show_counters.init_app(app, db, Venue, Artist, Show, ShowCounterState, on_recount=area_directory.rebuild)
+  show_partitions.init_app(app, db)
+  archive.init_app(app, db, Show, on_remove_shows=on_shows_remove)
+  bulk.init_app(app, db, BULK_ENTITIES)
+
+  app.register_blueprint(main)
+  app.register_blueprint(api)
+  assets.init_app(app)
+  init_filters(app)
+  # after the filters, preloaded templates are compiled against them
+  template_cache.init_app(app)
+  init_logging(app)
+  return app
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -603,11 +1418,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
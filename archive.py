@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, Index, Table, literal, select
+
+archive_cli = AppGroup('archive', help='Move deleted and old rows to the archive tables.')
+
+
+def archive_table(table):
+    # the columns of a live table, without its keys, defaults or indexes,
+    # plus when each row was archived. Ids are not unique there: SQLite may
+    # hand the id of a deleted row out again.
+    name = table.name + '_archive'
+    return Table(
+        name, table.metadata,
+        *[Column(column.name, column.type, nullable=column.nullable) for column in table.columns],
+        Column('archived_at', DateTime(timezone=False), nullable=False),
+        Index('ix_%s_id' % name, 'id'),
+        Index('ix_%s_archived_at' % name, 'archived_at'),
+    )
+
+
+class Archive(object):
+    # soft delete for venues, artists and shows. With ARCHIVE_DELETED on, the
+    # rows a delete is about to remove are copied to <table>_archive first, in
+    # the same transaction. `flask archive shows`, run from cron, moves shows
+    # older than ARCHIVE_SHOWS_AFTER_DAYS out of the live table a batch at a
+    # time, each batch in a transaction of its own, so the rows and index
+    # ranges it touches are only locked for the length of one batch.
+
+    def __init__(self, app=None, db=None, show=None, on_remove_shows=None):
+        if app is not None:
+            self.init_app(app, db, show, on_remove_shows)
+
+    def init_app(self, app, db, show, on_remove_shows=None):
+        self.db = db
+        self.show = show
+        # called with the condition matching shows about to be moved, in
+        # their batch's transaction, for data derived from them
+        self.on_remove_shows = on_remove_shows
+        self.on_delete = app.config['ARCHIVE_DELETED']
+        self.after_days = app.config['ARCHIVE_SHOWS_AFTER_DAYS']
+        self.batch_size = app.config['ARCHIVE_BATCH_SIZE']
+        app.extensions['archive'] = self
+        app.cli.add_command(archive_cli)
+
+    def copy(self, table, *conditions):
+        # INSERT ... SELECT of the rows matching the conditions into the
+        # table's archive, in the caller's transaction
+        archive = self.db.metadata.tables[table.name + '_archive']
+        names = [column.name for column in table.columns]
+        return self.db.session.execute(archive.insert().from_select(
+            names + ['archived_at'],
+            select(*table.columns, literal(datetime.now(), DateTime()).label('archived_at')).where(*conditions)
+        )).rowcount
+
+    def deleting(self, table, *conditions):
+        # archives the rows a delete is about to remove, when ARCHIVE_DELETED
+        # is on
+        if self.on_delete:
+            self.copy(table, *conditions)
+
+    def move_shows(self, before, batch_size=None, pause=0):
+        # moves the shows that started before `before`, oldest first and
+        # batch_size at a time through ix_show_date; commits every batch and
+        # returns the number of shows moved
+        batch_size = batch_size or self.batch_size
+        table = self.show.__table__
+        moved = 0
+        while True:
+            ids = self.db.session.scalars(
+                select(table.c.id).where(table.c.date < before).order_by(table.c.date).limit(batch_size)
+            ).all()
+            if not ids:
+                return moved
+            batch = table.c.id.in_(ids)
+            if self.on_remove_shows:
+                self.on_remove_shows(batch)
+            self.copy(table, batch)
+            self.db.session.execute(table.delete().where(batch))
+            self.db.session.commit()
+            moved += len(ids)
+            if pause:
+                time.sleep(pause)
+
+
+@archive_cli.command('shows')
+@click.option('--days', type=int, default=None, help='Age in days of the shows moved (ARCHIVE_SHOWS_AFTER_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Shows moved per transaction (ARCHIVE_BATCH_SIZE).')
+@click.option('--pause', type=float, default=0, help='Seconds to wait between batches.')
+def shows_command(days, batch_size, pause):
+    """Move old shows to the show_archive table."""
+    archive = current_app.extensions['archive']
+    days = archive.after_days if days is None else days
+    moved = archive.move_shows(datetime.now() - timedelta(days=days), batch_size, pause)
+    if moved and 'cache' in current_app.extensions:
+        current_app.extensions['cache'].invalidate('venue', 'artist', 'show')
+    click.echo('archived %d shows' % moved)
@@ -0,0 +1,104 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+areas_cli = AppGroup('areas', help='Maintain the materialized city/state area directory.')
+
+
+class AreaDirectory(object):
+    # one row per (state, city) with its number of venues and of upcoming
+    # shows, so /venues pages through areas instead of grouping every venue
+    # on each request. Writes add their changes to the areas they touch,
+    # inside the caller's transaction: `n = n + delta` keeps concurrent
+    # writers from overwriting each other's counts, where a recount would
+    # only see its own snapshot. rebuild() recomputes the whole directory.
+
+    def __init__(self, app=None, db=None, venue=None, area=None):
+        if app is not None:
+            self.init_app(app, db, venue, area)
+
+    def init_app(self, app, db, venue, area):
+        self.db = db
+        self.venue = venue
+        self.table = area.__table__
+        app.extensions['area_directory'] = self
+        app.cli.add_command(areas_cli)
+
+    def _counts(self, *conditions):
+        return select(
+            self.venue.state, self.venue.city, func.count(),
+            func.coalesce(func.sum(self.venue.upcoming_shows_count), 0)
+        ).where(*conditions).group_by(self.venue.state, self.venue.city)
+
+    def add_venues(self, venues):
+        # venues are (state, city, upcoming shows) tuples
+        self._apply((state, city, 1, upcoming) for state, city, upcoming in venues)
+
+    def remove_venues(self, venues):
+        self._apply((state, city, -1, -upcoming) for state, city, upcoming in venues)
+
+    def move_venue(self, old, new, upcoming):
+        # a venue whose (state, city) changed from old to new
+        if tuple(old) != tuple(new):
+            self._apply([tuple(old) + (-1, -upcoming), tuple(new) + (1, upcoming)])
+
+    def _apply(self, changes):
+        # changes are (state, city, venues, upcoming shows) deltas; one
+        # executemany upsert for all the areas, then the areas left without
+        # venues go
+        deltas = {}
+        for state, city, venues, upcoming in changes:
+            delta = deltas.setdefault((state, city), [0, 0])
+            delta[0] += venues
+            delta[1] += upcoming
+        deltas = dict((area, delta) for area, delta in deltas.items() if delta != [0, 0])
+        if not deltas:
+            return
+        table = self.table
+        insert = postgresql.insert if self.db.session.get_bind().dialect.name == 'postgresql' else sqlite.insert
+        statement = insert(table)
+        self.db.session.execute(statement.on_conflict_do_update(
+            index_elements=['state', 'city'],
+            set_={'num_venues': table.c.num_venues + statement.excluded.num_venues,
+                  'num_upcoming_shows': table.c.num_upcoming_shows + statement.excluded.num_upcoming_shows}
+        ), [{'state': state, 'city': city, 'num_venues': venues, 'num_upcoming_shows': upcoming}
+            for (state, city), (venues, upcoming) in deltas.items()])
+        self.db.session.execute(table.delete().where(
+            tuple_(table.c.state, table.c.city).in_(list(deltas)), table.c.num_venues <= 0
+        ))
+
+    def add_shows(self, changes):
+        # changes are {venue id: [upcoming, past]} as ShowCounters.add() and
+        # remove_matching() return them. Run after those, whose UPDATE locks
+        # the venues: each venue's area is then read as of that lock, so a
+        # concurrent edit moving the venue either lands before or waits.
+        table = self.table
+        changes = [{'_id': id, '_upcoming': upcoming} for id, (upcoming, past) in changes.items() if upcoming]
+        if changes:
+            def of_venue(column):
+                return select(column).where(self.venue.id == bindparam('_id')).scalar_subquery()
+            self.db.session.execute(
+                table.update().where(
+                    table.c.state == of_venue(self.venue.state), table.c.city == of_venue(self.venue.city)
+                ).values(num_upcoming_shows=table.c.num_upcoming_shows + bindparam('_upcoming')),
+                changes
+            )
+
+    def rebuild(self):
+        self.db.session.execute(self.table.delete())
+        self.db.session.execute(self.table.insert().from_select(
+            ['state', 'city', 'num_venues', 'num_upcoming_shows'], self._counts()
+        ))
+
+
+@areas_cli.command('rebuild')
+def rebuild_command():
+    """Recompute every area from the venues table."""
+    directory = current_app.extensions['area_directory']
+    directory.rebuild()
+    directory.db.session.commit()
+    if 'cache' in current_app.extensions:
+        current_app.extensions['cache'].invalidate('venue')
+    click.echo('rebuilt the area directory')
@@ -0,0 +1,57 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point.
+#
+#   SECRET_KEY=... uvicorn asgi:application --workers 4
+#
+# The workers share SECRET_KEY (see config.py), or the CSRF token a form got
+# from one of them fails on the others.
+#
+# Requests run on a thread pool next to the server's event loop. The queries
+# of show_venue, show_artist and shows run on that loop itself (async_db.py),
+# so independent lookups of one page run concurrently, while their templates
+# render back on the request's thread and never hold up the loop.
+#----------------------------------------------------------------------------#
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import create_app, async_db
+
+app = create_app()
+
+executor = ThreadPoolExecutor(max_workers=app.config['ASGI_THREADS'], thread_name_prefix='asgi')
+
+
+class ConcurrentWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every request on one shared thread (thread_sensitive) to be
+    # safe for code that is not thread-safe; Flask requests are independent
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False, executor=executor)
+
+
+class Application(WsgiToAsgi):
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        else:
+            await ConcurrentWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(
+                scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # the lookups run here rather than on a loop of their own
+                async_db.loop = asyncio.get_running_loop()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_db.dispose()
+                executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = Application(app)
@@ -0,0 +1,196 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+
+assets_cli = AppGroup('assets', help='Build the fingerprinted static bundles.')
+
+# bundles referenced by templates/layouts, built from the files under static/
+# in this order (the JS ones run deferred, script.js first as it always did)
+BUNDLES = {
+    'css/site.css': [
+        'css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css', 'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    'js/head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    'js/site.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+
+# referenced on their own (CDN fallbacks, IE-only scripts, images) and only
+# fingerprinted
+FILES = ['js/libs/jquery-1.11.1.min.js', 'js/libs/respond-1.4.2.min.js', 'img/front-splash.jpg']
+
+BUILD_DIR = 'dist'
+MANIFEST = 'manifest.json'
+# worth precompressing; images and fonts are compressed already
+COMPRESSIBLE = ('.css', '.js', '.svg')
+# (Content-Encoding, suffix of the precompressed sibling), in preference order
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+class Assets(object):
+    # serves the output of `flask assets build`: content-hashed bundles under
+    # static/dist, listed in its manifest. url_for('static', filename=...)
+    # resolves a source name to its hashed file, and those are sent with an
+    # immutable Cache-Control and, when the client accepts it, from their
+    # precompressed .br/.gz sibling. Without a build everything is served
+    # from static/ as before.
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.hashed = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.build_dir = os.path.join(app.static_folder, BUILD_DIR)
+        self.max_age = app.config['ASSETS_MAX_AGE']
+        self.load()
+        app.url_defaults(self.hashed_filename)
+        app.view_functions['static'] = self.send_static_file
+        app.jinja_env.globals['bundle'] = self.bundle
+        app.extensions['assets'] = self
+        app.cli.add_command(assets_cli)
+
+    def load(self):
+        path = os.path.join(self.build_dir, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+        self.hashed = set(self.manifest.values())
+
+    def bundle(self, name):
+        # static filenames to link for a bundle: the bundle once built,
+        # otherwise its sources one by one
+        return [name] if name in self.manifest else BUNDLES[name]
+
+    def hashed_filename(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+
+    def send_static_file(self, filename):
+        if filename not in self.hashed:
+            return current_app.send_static_file(filename)
+
+        path, encoding = filename, None
+        if filename.endswith(COMPRESSIBLE):
+            for name, suffix in ENCODINGS:
+                if not request.accept_encodings[name]:
+                    continue
+                if os.path.exists(os.path.join(current_app.static_folder, filename + suffix)):
+                    path, encoding = filename + suffix, name
+                    break
+        response = send_from_directory(current_app.static_folder, path, mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=self.max_age)
+        if encoding:
+            response.content_encoding = encoding
+        if filename.endswith(COMPRESSIBLE):
+            response.vary.add('Accept-Encoding')
+        # the name changes with the content, so it never needs revalidating
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def fingerprinted(name, data):
+    root, ext = posixpath.splitext(name)
+    return posixpath.join(BUILD_DIR, '%s.%s%s' % (root, hashlib.sha256(data).hexdigest()[:12], ext))
+
+
+def rebase_urls(css, source, target):
+    # relative url()s of a stylesheet moved from source to target (both
+    # relative to static/) must still point at the same files
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')) or '//' in url:
+            return match.group(0)
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        return 'url(%s%s%s)' % (quote, posixpath.relpath(path, posixpath.dirname(target)), quote)
+    return CSS_URL.sub(rebase, css)
+
+
+def bundled(name, sources, static_folder):
+    import rcssmin
+    import rjsmin
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            text = f.read()
+        if name.endswith('.css'):
+            # the bundle lands in static/dist/css, next to its hashed name
+            parts.append(rebase_urls(rcssmin.cssmin(text, keep_bang_comments=True), source,
+                                     posixpath.join(BUILD_DIR, name)))
+        else:
+            parts.append(rjsmin.jsmin(text, keep_bang_comments=True))
+    # a script missing its final semicolon must not run into the next one
+    return (';\n' if name.endswith('.js') else '\n').join(parts).encode('utf-8')
+
+
+def write(static_folder, name, data):
+    path = os.path.join(static_folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    sizes = [len(data)]
+    if name.endswith(COMPRESSIBLE):
+        compressed = {'.gz': gzip.compress(data, 9, mtime=0)}
+        try:
+            import brotli
+            compressed['.br'] = brotli.compress(data, quality=11)
+        except ImportError:
+            pass
+        for suffix, content in compressed.items():
+            with open(path + suffix, 'wb') as f:
+                f.write(content)
+        sizes += [len(compressed['.gz']), len(compressed.get('.br', b''))]
+    return sizes
+
+
+def report(name, original, sizes):
+    click.echo('%-52s %9d' % (name, original) + ''.join(' %9d' % size for size in sizes))
+
+
+@assets_cli.command('build')
+def build_command():
+    """Bundle, minify, fingerprint and precompress the static assets."""
+    assets = current_app.extensions['assets']
+    static_folder = current_app.static_folder
+    shutil.rmtree(assets.build_dir, ignore_errors=True)
+    manifest = {}
+
+    click.echo('%-52s %9s %9s %9s %9s' % ('file', 'sources', 'output', 'gzip', 'brotli'))
+    for name, sources in BUNDLES.items():
+        data = bundled(name, sources, static_folder)
+        manifest[name] = fingerprinted(name, data)
+        original = sum(os.path.getsize(os.path.join(static_folder, source)) for source in sources)
+        report(manifest[name], original, write(static_folder, manifest[name], data))
+
+    for name in FILES:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            data = f.read()
+        manifest[name] = fingerprinted(name, data)
+        report(manifest[name], len(data), write(static_folder, manifest[name], data))
+
+    with open(os.path.join(assets.build_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    assets.load()
+
+
+@assets_cli.command('clean')
+def clean_command():
+    """Remove the build, static files are served as they are again."""
+    assets = current_app.extensions['assets']
+    shutil.rmtree(assets.build_dir, ignore_errors=True)
+    assets.load()
+    click.echo('removed %s' % assets.build_dir)
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+# async driver used for each database the sync engine can point at
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+
+
+def async_uri(uri):
+    # postgresql://... -> postgresql+asyncpg://..., sqlite:///... -> sqlite+aiosqlite:///...
+    scheme, rest = uri.split('://', 1)
+    return '%s://%s' % (ASYNC_DRIVERS.get(scheme.split('+')[0], scheme), rest)
+
+
+class AsyncDB(object):
+    # async engine next to Flask-SQLAlchemy's, for the independent lookups of
+    # a page. Pooled async connections belong to the event loop that opened
+    # them, so the queries run on one long-lived loop: the server's under the
+    # ASGI entry point (asgi.py sets it at startup), otherwise a background
+    # thread started on first use. The request thread waits for the results
+    # and renders the page itself, keeping templates off the loop.
+
+    def __init__(self, app=None):
+        self.loop = None
+        self._engine = None
+        self._sessionmaker = None
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.uri = app.config.get('ASYNC_DATABASE_URI') or async_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+        self.options = dict((key, value) for key, value in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items()
+                            if key in POOL_OPTIONS)
+        # its own share of the connections of the pool profile, not a second
+        # pool as large as the sync engine's
+        if 'pool_size' in self.options:
+            self.options.update(pool_size=app.config['ASYNC_POOL_SIZE'],
+                                max_overflow=app.config['ASYNC_MAX_OVERFLOW'])
+        # asyncpg takes server settings instead of libpq's `options`
+        if self.uri.startswith('postgresql') and app.config.get('DB_STATEMENT_TIMEOUT'):
+            self.options['connect_args'] = {
+                'server_settings': {'statement_timeout': str(app.config['DB_STATEMENT_TIMEOUT'])}
+            }
+        self.profiler = app.extensions.get('profiler')
+        app.extensions['async_db'] = self
+
+    def gather(self, *awaitables):
+        # runs the lookups concurrently on the loop and returns their results
+        # to the calling thread, in order
+        async def gathered():
+            return await asyncio.gather(*awaitables)
+        return asyncio.run_coroutine_threadsafe(gathered(), self._loop()).result()
+
+    def _loop(self):
+        if self.loop is None:
+            with self.lock:
+                if self.loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+                    self.loop = loop
+        return self.loop
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._create()
+        return self._engine
+
+    def _create(self):
+        # the asyncio extension (and the driver) load with the first lookup
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        with self.lock:
+            if self._engine is not None:
+                return
+            engine = create_async_engine(self.uri, **self.options)
+            if self.profiler is not None:
+                self.profiler.watch(engine.sync_engine)
+            self._sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+            self._engine = engine
+
+    def session(self):
+        # each concurrent lookup needs a session (and connection) of its own
+        if self._engine is None:
+            self._create()
+        return self._sessionmaker()
+
+    async def get(self, model, id):
+        async with self.session() as session:
+            return await session.get(model, id)
+
+    async def all(self, statement):
+        async with self.session() as session:
+            return (await session.execute(statement)).all()
+
+    async def dispose(self):
+        if self._engine is not None:
+            await self._engine.dispose()
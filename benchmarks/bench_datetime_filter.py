@@ -0,0 +1,58 @@
+#----------------------------------------------------------------------------#
+# Micro-benchmark for the `datetime` template filter.
+#
+# Compares the original dateutil + babel filter with filters.format_datetime
+# on datetime objects, ISO strings and through the optional LRU.
+# Run with "python benchmarks/bench_datetime_filter.py".
+#----------------------------------------------------------------------------#
+
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates
+import dateutil.parser
+from filters import format_datetime, cached_format_datetime
+
+NUMBER = 5000
+
+
+def legacy_format_datetime(value, format='medium'):
+  # the filter as it was originally defined in app.py
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format)
+
+
+def main():
+  start = datetime(2020, 5, 21, 21, 30)
+  # a page of show tiles: a few hundred distinct time slots
+  dates = [start + timedelta(hours=i % 300) for i in range(NUMBER)]
+  strings = [str(date) for date in dates]
+  cached = cached_format_datetime()
+
+  for format in ['full', 'medium']:
+    assert legacy_format_datetime(strings[0], format) == format_datetime(dates[0], format)
+
+  cases = [
+    ('legacy (str + dateutil)', lambda: [legacy_format_datetime(value, 'full') for value in strings]),
+    ('new (ISO string)', lambda: [format_datetime(value, 'full') for value in strings]),
+    ('new (datetime)', lambda: [format_datetime(value, 'full') for value in dates]),
+    ('new (datetime + LRU)', lambda: [cached(value, 'full') for value in dates]),
+  ]
+
+  baseline = None
+  for name, case in cases:
+    elapsed = min(timeit.repeat(case, number=1, repeat=3))
+    baseline = baseline or elapsed
+    print('%-24s %8.1f us/call  %5.1fx' % (name, elapsed / NUMBER * 1e6, baseline / elapsed))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,56 @@
+#----------------------------------------------------------------------------#
+# Timings of the venue and artist detail pages.
+#
+# A single venue and a single artist share a growing number of shows; the
+# two-query budget of both pages is asserted by tests/test_detail_pages.py.
+# Run with "python benchmarks/bench_detail_pages.py".
+#----------------------------------------------------------------------------#
+
+import time
+from datetime import datetime, timedelta
+
+from common import app, db, QueryCounter, reset_db, cleanup
+from app import Venue, Artist, Show
+
+SCALES = [10, 100, 2000]
+
+
+def seed(num_shows):
+  reset_db()
+  venue = Venue(name='Bench Venue', genres=['Jazz'], city='San Francisco', state='CA', address='1 Main St',
+                phone='123-123-1234', image_link='https://example.com/v.jpg')
+  artist = Artist(name='Bench Artist', genres=['Jazz'], city='San Francisco', state='CA',
+                  phone='123-123-1234', image_link='https://example.com/a.jpg')
+  db.session.add_all([venue, artist])
+  db.session.flush()
+
+  now = datetime.now()
+  db.session.add_all([
+    Show(venue_id=venue.id, artist_id=artist.id, date=now + timedelta(days=i - num_shows // 2))
+    for i in range(num_shows)
+  ])
+  db.session.commit()
+  return venue.id, artist.id
+
+
+def main():
+  client = app.test_client()
+
+  with app.app_context():
+    for num_shows in SCALES:
+      venue_id, artist_id = seed(num_shows)
+
+      for url in ['/venues/%d' % venue_id, '/artists/%d' % artist_id]:
+        with QueryCounter() as queries:
+          start = time.perf_counter()
+          response = client.get(url)
+          elapsed = time.perf_counter() - start
+
+        assert response.status_code == 200
+        print('%5d shows %-12s %3d queries, %8.1f ms' % (num_shows, url, queries.count, elapsed * 1000))
+
+  cleanup()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,111 @@
+#----------------------------------------------------------------------------#
+# Throughput of concurrent venue edits.
+#
+# Writer threads repeatedly open the edit form of one of a few popular
+# venues and submit a change, for a number of writers and sizes of the hot
+# set. Each edit carries the version its form was filled from, so one that
+# lost a race is rejected and retried from a fresh form instead of silently
+# overwriting the other. Reports attempts, saved edits (the version
+# increments found in the database afterwards) and rejected ones per second.
+# With --blind the forms are submitted without their version, so only the
+# edits racing between their read and their UPDATE are rejected.
+#
+#   python benchmarks/bench_edit_contention.py --writers 1,4,16 --hot 1,10,100
+#----------------------------------------------------------------------------#
+
+import argparse
+import re
+import threading
+import time
+
+from common import app, db, reset_db, cleanup
+from app import Venue
+
+VERSION = re.compile(r'name="version" type="hidden" value="(\d+)"')
+
+FORM = {
+  'city': 'San Francisco', 'state': 'CA', 'address': '1 Main St', 'phone': '555-123-4567',
+  'genres': ['Jazz', 'Blues'], 'image_link': 'https://example.com/v.jpg',
+  'facebook_link': 'https://www.facebook.com/bench', 'website_link': 'https://example.com',
+  'seeking': 'No', 'seeking_message': '',
+}
+
+
+def seed(num_venues):
+  reset_db()
+  db.session.add_all([
+    Venue(name='Venue %d' % i, **dict(FORM, seeking=False))
+    for i in range(num_venues)
+  ])
+  db.session.commit()
+
+
+def writer(number, hot, deadline, blind, stats):
+  client = app.test_client()
+  attempts = rejected = 0
+  i = 0
+  while time.perf_counter() < deadline:
+    venue_id = (number + i) % hot + 1
+    i += 1
+    version = VERSION.search(client.get('/venues/%d/edit' % venue_id).get_data(as_text=True)).group(1)
+    response = client.post('/venues/%d/edit' % venue_id, data=dict(
+      FORM, name='Venue %d edit %d-%d' % (venue_id, number, i), version='' if blind else version
+    ))
+    attempts += 1
+    # a rejected edit is sent back to the form
+    if response.location.endswith('/edit'):
+      rejected += 1
+  stats.append((attempts, rejected))
+
+
+def run(writers, hot, seconds, blind=False):
+  with app.app_context():
+    seed(hot)
+
+  stats = []
+  deadline = time.perf_counter() + seconds
+  threads = [threading.Thread(target=writer, args=(number, hot, deadline, blind, stats)) for number in range(writers)]
+  start = time.perf_counter()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  elapsed = time.perf_counter() - start
+
+  with app.app_context():
+    saved = db.session.scalar(db.select(db.func.sum(Venue.version - 1)))
+  # edits that never save (an unbound form, a failing UPDATE) would show up
+  # as failures only, and measure nothing
+  assert saved, 'no edit was saved'
+  attempts = sum(attempt for attempt, _ in stats)
+  rejected = sum(reject for _, reject in stats)
+  return {
+    'attempts': attempts / elapsed,
+    'saved': saved / elapsed,
+    'rejected': rejected / elapsed,
+    # neither saved nor rejected, e.g. the database was locked for too long
+    'failed': attempts - saved - rejected,
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Throughput of concurrent edits to popular venues.')
+  parser.add_argument('--writers', default='1,4,16', help='comma-separated numbers of writer threads')
+  parser.add_argument('--hot', default='1,10,100', help='comma-separated numbers of venues being edited')
+  parser.add_argument('--seconds', type=float, default=3)
+  parser.add_argument('--blind', action='store_true', help='submit the edits without their version')
+  args = parser.parse_args()
+
+  print('%7s %5s %11s %9s %12s %7s' % ('writers', 'hot', 'attempts/s', 'saved/s', 'rejected/s', 'failed'))
+  for hot in [int(value) for value in args.hot.split(',')]:
+    for writers in [int(value) for value in args.writers.split(',')]:
+      result = run(writers, hot, args.seconds, args.blind)
+      print('%7d %5d %11.1f %9.1f %12.1f %7d' % (
+        writers, hot, result['attempts'], result['saved'], result['rejected'], result['failed']
+      ))
+
+  cleanup()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# Memory profile of the list pages, buffered vs streamed.
+#
+# Generates a data set, then requests each list page with STREAM_LIST_PAGES
+# off and on and reports, per mode, the time to first byte, the time to the
+# last byte and the peak Python memory allocated while the request ran
+# (tracemalloc, measured in a separate pass so it does not skew the times).
+# Streamed pages should keep a flat peak as the scale grows; at 1m the
+# directory holds 50k artists and 100k venues.
+#
+#   python benchmarks/bench_list_memory.py --scale 100k
+#   python benchmarks/bench_list_memory.py --scale 1m
+#----------------------------------------------------------------------------#
+
+import argparse
+import time
+import tracemalloc
+
+from common import app, reset_db, cleanup
+from datagen import SCALES, generate
+
+ROUTES = ['/artists', '/venues?genre=Jazz', '/venues', '/shows']
+
+MODES = [('buffered', False), ('streamed', True)]
+
+RUNS = 3
+
+
+def consume(client, route):
+  # (ms to the first chunk, ms to the last, body size); chunks are dropped
+  # as they arrive, the way a server writes them to the socket
+  start = time.perf_counter()
+  response = client.get(route, buffered=False)
+  chunks = iter(response.response)
+  size = len(next(chunks, b''))
+  first = time.perf_counter() - start
+  for chunk in chunks:
+    size += len(chunk)
+  last = time.perf_counter() - start
+  response.close()
+  assert response.status_code == 200, (route, response.status_code)
+  return first * 1000, last * 1000, size
+
+
+def peak_memory(client, route):
+  tracemalloc.start()
+  try:
+    consume(client, route)
+    return tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Peak memory and time to first byte of the list pages.')
+  parser.add_argument('--scale', default='100k', choices=sorted(SCALES))
+  args = parser.parse_args()
+
+  with app.app_context():
+    reset_db()
+    counts = generate(SCALES[args.scale])
+  print('%(venues)d venues, %(artists)d artists, %(shows)d shows' % counts)
+
+  client = app.test_client()
+  print('%-18s %-9s %9s %9s %10s %10s' % ('route', 'mode', 'ttfb ms', 'total ms', 'peak KiB', 'body KiB'))
+  for route in ROUTES:
+    for mode, streamed in MODES:
+      app.config['STREAM_LIST_PAGES'] = streamed
+      # the first request warms the template and statement caches
+      consume(client, route)
+      runs = [consume(client, route) for i in range(RUNS)]
+      first = sorted(run[0] for run in runs)[RUNS // 2]
+      last = sorted(run[1] for run in runs)[RUNS // 2]
+      peak = peak_memory(client, route)
+      print('%-18s %-9s %9.2f %9.1f %10.0f %10.0f' % (route, mode, first, last, peak / 1024.0, runs[0][2] / 1024.0))
+
+  cleanup()
+
+
+if __name__ == '__main__':
+  main()
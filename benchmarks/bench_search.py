@@ -0,0 +1,65 @@
+#----------------------------------------------------------------------------#
+# Latency benchmark for the venue name search.
+#
+# Fills the venue table with 10k/100k/1M rows and times search() against the
+# unindexed, unbounded ILIKE scan the search routes used to run. Uses the FTS5 tables on SQLite, or the
+# trigram indexes when DATABASE_URL points at PostgreSQL.
+# Run with "python benchmarks/bench_search.py [rows ...]".
+#----------------------------------------------------------------------------#
+
+import random
+import sys
+import time
+
+from common import app, db, reset_db, cleanup
+from app import Venue, search
+
+SCALES = [10000, 100000, 1000000]
+WORDS = ['the', 'musical', 'hop', 'park', 'square', 'live', 'music', 'coffee', 'dueling',
+         'pianos', 'bar', 'jazz', 'club', 'hall', 'lounge', 'room', 'garden', 'social']
+TERMS = ['music', 'piano', 'jazz club', 'lounge', 'zzz']
+BATCH = 10000
+
+
+def seed(num_rows):
+  reset_db()
+  rng = random.Random(num_rows)
+  for start in range(0, num_rows, BATCH):
+    db.session.execute(Venue.__table__.insert(), [
+      {
+        'name': ' '.join(rng.choice(WORDS) for _ in range(3)).title() + ' %d' % i,
+        'seeking': False, 'genres': ['Jazz'], 'city': 'San Francisco', 'state': 'CA',
+        'address': '1 Main St', 'phone': '123-123-1234', 'image_link': 'https://example.com/v.jpg'
+      }
+      for i in range(start, min(start + BATCH, num_rows))
+    ])
+  db.session.commit()
+
+
+def timed(fn, repeat=5):
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best * 1000
+
+
+def main():
+  scales = [int(arg) for arg in sys.argv[1:]] or SCALES
+
+  with app.app_context():
+    print('%8s %-10s %12s %12s' % ('rows', 'term', 'search ms', 'ilike ms'))
+    for num_rows in scales:
+      seed(num_rows)
+      for term in TERMS:
+        indexed = timed(lambda: search(Venue, term, limit=50))
+        scan = timed(lambda: Venue.query.filter(Venue.name.ilike(f'%{term}%')).all())
+        print('%8d %-10s %12.2f %12.2f' % (num_rows, term, indexed, scan))
+
+  cleanup()
+
+
+if __name__ == '__main__':
+  main()
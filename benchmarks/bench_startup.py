@@ -0,0 +1,107 @@
+#----------------------------------------------------------------------------#
+# Cold vs warm time to first byte per route.
+#
+# Generates a data set, then for each template setup and route starts a fresh
+# Python process, as a newly forked worker would be, and times the import of
+# the app, the first request to the route (cold) and the median of the
+# following ones (warm). Setups:
+#
+#   lazy      no bytecode cache, templates compiled on first use
+#   bytecode  filesystem bytecode cache filled by `flask templates compile`
+#   preload   bytecode cache plus every template loaded at startup
+#
+#   python benchmarks/bench_startup.py --scale 1k
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROUTES = [
+  '/', '/venues', '/artists', '/shows', '/venues/1', '/artists/1', '/venues/1/edit', '/artists/1/edit',
+  '/venues/create', '/artists/create', '/shows/create',
+]
+
+SETUPS = {
+  'lazy': {'TEMPLATE_BYTECODE_CACHE': 'null', 'TEMPLATE_PRELOAD': 'false'},
+  'bytecode': {'TEMPLATE_BYTECODE_CACHE': 'filesystem', 'TEMPLATE_PRELOAD': 'false'},
+  'preload': {'TEMPLATE_BYTECODE_CACHE': 'filesystem', 'TEMPLATE_PRELOAD': 'true'},
+}
+
+WARM_REQUESTS = 5
+
+
+def ttfb(client, route):
+  # time until the first chunk of the body is available
+  start = time.perf_counter()
+  response = client.get(route, buffered=False)
+  next(iter(response.response), b'')
+  elapsed = time.perf_counter() - start
+  response.close()
+  assert response.status_code == 200, (route, response.status_code)
+  return elapsed * 1000
+
+
+def measure(route):
+  # runs in the child process
+  start = time.perf_counter()
+  from common import app
+  startup = (time.perf_counter() - start) * 1000
+
+  client = app.test_client()
+  cold = ttfb(client, route)
+  warm = sorted(ttfb(client, route) for i in range(WARM_REQUESTS))[WARM_REQUESTS // 2]
+  print(json.dumps({'startup': startup, 'cold': cold, 'warm': warm}))
+
+
+def child(setup, route, env):
+  output = subprocess.check_output(
+    [sys.executable, __file__, '--measure', route], env=dict(env, **SETUPS[setup]), text=True
+  )
+  return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time to first byte per route, cold vs warm.')
+  parser.add_argument('--scale', default='1k')
+  args = parser.parse_args()
+
+  from common import app, reset_db, cleanup
+  from datagen import SCALES, generate
+
+  with app.app_context():
+    reset_db()
+    generate(SCALES[args.scale])
+
+  cache_dir = tempfile.mkdtemp(prefix='jinja_cache')
+  env = dict(os.environ, TEMPLATE_CACHE_DIR=cache_dir, PROFILING_ENABLED='false')
+  # the build step, run once before the workers start
+  subprocess.check_call([sys.executable, '-m', 'flask', '--app', 'app', 'templates', 'compile'],
+                        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env)
+
+  print('%-9s %-17s %11s %9s %9s' % ('setup', 'route', 'startup ms', 'cold ms', 'warm ms'))
+  totals = {}
+  for setup in SETUPS:
+    for route in ROUTES:
+      result = child(setup, route, env)
+      totals[setup] = totals.get(setup, 0) + result['startup'] + result['cold']
+      print('%-9s %-17s %11.1f %9.2f %9.2f' % (setup, route, result['startup'], result['cold'], result['warm']))
+
+  # what a fresh worker pays before answering its first request
+  for setup, total in totals.items():
+    print('%-9s startup + cold, mean over routes: %.1f ms' % (setup, total / len(ROUTES)))
+
+  shutil.rmtree(cache_dir)
+  cleanup()
+
+
+if __name__ == '__main__':
+  if sys.argv[1:2] == ['--measure']:
+    measure(sys.argv[2])
+  else:
+    main()
@@ -0,0 +1,65 @@
+#----------------------------------------------------------------------------#
+# Benchmark for the /venues area listing.
+#
+# Seeds a throwaway SQLite database with a growing number of venues, spread
+# over half as many cities (hyphenated names included), and checks that the
+# route issues the same number of queries whatever the venue count. Run with "python benchmarks/bench_venues.py".
+#----------------------------------------------------------------------------#
+
+import time
+from datetime import datetime, timedelta
+
+from common import app, db, QueryCounter, reset_db, cleanup
+from app import Venue, Artist, Show, show_counters
+
+SCALES = [10, 100, 1000, 10000]
+STATES = ['CA', 'NY', 'NC', 'TX']
+
+
+def seed(num_venues):
+  reset_db()
+  artist = Artist(name='Bench Artist', genres=['Jazz'], city='San Francisco', state='CA',
+                  phone='123-123-1234', image_link='https://example.com/a.jpg')
+  db.session.add(artist)
+  db.session.flush()
+
+  now = datetime.now()
+  for i in range(num_venues):
+    area = i % max(num_venues // 2, 1)
+    city, state = 'Winston-Salem %d' % area, STATES[area % len(STATES)]
+    venue = Venue(name='Venue %d' % i, genres=['Jazz'], city=city, state=state, address='1 Main St',
+                  phone='123-123-1234', image_link='https://example.com/v.jpg')
+    db.session.add(venue)
+    db.session.flush()
+    db.session.add_all([
+      Show(venue_id=venue.id, artist_id=artist.id, date=now + timedelta(days=1)),
+      Show(venue_id=venue.id, artist_id=artist.id, date=now - timedelta(days=1)),
+    ])
+  db.session.commit()
+  # fills the counters and the area directory
+  show_counters.rebuild()
+
+
+def main():
+  counts = []
+  client = app.test_client()
+
+  with app.app_context():
+    for num_venues in SCALES:
+      seed(num_venues)
+
+      with QueryCounter() as queries:
+        start = time.perf_counter()
+        response = client.get('/venues')
+        elapsed = time.perf_counter() - start
+
+      assert response.status_code == 200
+      counts.append(queries.count)
+      print('%6d venues: %3d queries, %8.1f ms' % (num_venues, queries.count, elapsed * 1000))
+
+  cleanup()
+  assert len(set(counts)) == 1, 'query count grows with the number of venues: %r' % counts
+
+
+if __name__ == '__main__':
+  main()
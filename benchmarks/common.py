@@ -0,0 +1,61 @@
+#----------------------------------------------------------------------------#
+# Shared helpers for the benchmark scripts.
+#----------------------------------------------------------------------------#
+
+import os
+import sys
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'bench.db')
+
+# benchmarks run against a throwaway SQLite database unless told otherwise
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + db_path)
+# data is seeded behind the app's back, so cached pages would go stale;
+# benchmarks measure the uncached path unless a backend is asked for
+os.environ.setdefault('CACHE_BACKEND', 'null')
+# the benchmarks count their own queries; keep the profiler's overhead out
+os.environ.setdefault('PROFILING_ENABLED', 'false')
+sys.path.insert(0, os.path.dirname(basedir))
+
+from sqlalchemy import event
+from app import create_app, db, async_db
+
+app = create_app()
+# forms are posted without fetching their CSRF token first
+app.config['WTF_CSRF_ENABLED'] = False
+
+
+class QueryCounter(object):
+  # records every statement sent to the database while active, through the
+  # sync engine or the async lookups' engine
+
+  def __init__(self):
+    self.statements = []
+    self.parameters = []
+
+  def __enter__(self):
+    for engine in (db.engine, async_db.engine.sync_engine):
+      event.listen(engine, 'before_cursor_execute', self._record)
+    return self
+
+  def __exit__(self, *exc):
+    for engine in (db.engine, async_db.engine.sync_engine):
+      event.remove(engine, 'before_cursor_execute', self._record)
+
+  def _record(self, conn, cursor, statement, parameters, *args):
+    self.statements.append(statement)
+    self.parameters.append(parameters)
+
+  @property
+  def count(self):
+    return len(self.statements)
+
+
+def reset_db():
+  db.drop_all()
+  db.create_all()
+
+
+def cleanup():
+  if os.path.exists(db_path):
+    os.remove(db_path)
@@ -0,0 +1,115 @@
+#----------------------------------------------------------------------------#
+# Deterministic synthetic data for the benchmarks.
+#
+# generate(num_shows) fills Venue/Artist/Show with one venue per 10 shows and
+# one artist per 20 shows. Cities follow a skewed distribution (a few big
+# cities hold most venues), venues and artists carry 1-3 genres drawn with
+# realistic weights, and shows are spread over the year around today with
+# roughly a third of them upcoming. The same seed always yields the same rows.
+#----------------------------------------------------------------------------#
+
+import random
+from datetime import datetime, timedelta
+
+from common import db
+from app import Venue, Artist, Show, show_counters
+
+# (city, state, weight)
+CITIES = [
+  ('New York', 'NY', 30), ('Los Angeles', 'CA', 22), ('Chicago', 'IL', 14), ('Houston', 'TX', 10),
+  ('Nashville', 'TN', 9), ('Austin', 'TX', 9), ('San Francisco', 'CA', 8), ('Seattle', 'WA', 7),
+  ('New Orleans', 'LA', 7), ('Atlanta', 'GA', 6), ('Denver', 'CO', 5), ('Portland', 'OR', 5),
+  ('Minneapolis', 'MN', 4), ('Detroit', 'MI', 4), ('Philadelphia', 'PA', 4), ('Boston', 'MA', 4),
+  ('Winston-Salem', 'NC', 2), ('Wilkes-Barre', 'PA', 1), ('Burlington', 'VT', 1), ('Boise', 'ID', 1),
+]
+
+# (genre, weight), names match the choices in forms.py
+GENRES = [
+  ('Rock n Roll', 20), ('Pop', 16), ('Hip-Hop', 12), ('Jazz', 10), ('Alternative', 9), ('Electronic', 8),
+  ('R&B', 7), ('Country', 6), ('Folk', 5), ('Blues', 5), ('Classical', 4), ('Soul', 4), ('Punk', 4),
+  ('Reggae', 3), ('Funk', 3), ('Heavy Metal', 3), ('Instrumental', 2), ('Musical Theatre', 1), ('Other', 1),
+]
+
+WORDS = ['The', 'Musical', 'Hop', 'Park', 'Square', 'Live', 'Dueling', 'Pianos', 'Blue', 'Note', 'Velvet',
+         'Room', 'Garden', 'Social', 'Hall', 'Lounge', 'Electric', 'Owl', 'Fox', 'Crow', 'Echo', 'Static']
+
+BATCH = 5000
+
+SCALES = {
+  '1k': 1000,
+  '100k': 100000,
+  '1m': 1000000,
+}
+
+
+def weighted(rng, choices):
+  values, weights = zip(*[(choice[:-1], choice[-1]) for choice in choices])
+  cumulative = []
+  total = 0
+  for weight in weights:
+    total += weight
+    cumulative.append(total)
+
+  def pick():
+    return values[next(i for i, bound in enumerate(cumulative) if rng.random() * total < bound)]
+  return pick
+
+
+def insert(model, rows):
+  for start in range(0, len(rows), BATCH):
+    db.session.execute(model.__table__.insert(), rows[start:start + BATCH])
+
+
+def generate(num_shows, seed=1):
+  rng = random.Random(seed)
+  city = weighted(rng, CITIES)
+  genre = weighted(rng, GENRES)
+  now = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+  def genres():
+    return sorted(set(genre()[0] for _ in range(rng.randint(1, 3))))
+
+  def name(suffix):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 3))) + ' ' + suffix
+
+  num_venues = max(num_shows // 10, 1)
+  num_artists = max(num_shows // 20, 1)
+
+  venues = []
+  for i in range(num_venues):
+    venue_city, venue_state = city()
+    venues.append({
+      'name': name('%d' % i), 'genres': genres(), 'city': venue_city, 'state': venue_state,
+      'address': '%d Main St' % rng.randint(1, 9999), 'phone': '555-%03d-%04d' % (rng.randint(0, 999), i % 10000),
+      'image_link': 'https://example.com/venues/%d.jpg' % i, 'website_link': 'https://example.com/v/%d' % i,
+      'facebook_link': 'https://www.facebook.com/venue%d' % i, 'seeking': rng.random() < 0.3,
+      'seeking_message': 'Looking for local acts' if rng.random() < 0.3 else None,
+    })
+  insert(Venue, venues)
+
+  artists = []
+  for i in range(num_artists):
+    artist_city, artist_state = city()
+    artists.append({
+      'name': name('Band %d' % i), 'genres': genres(), 'city': artist_city, 'state': artist_state,
+      'phone': '555-%03d-%04d' % (rng.randint(0, 999), i % 10000),
+      'image_link': 'https://example.com/artists/%d.jpg' % i, 'website_link': 'https://example.com/a/%d' % i,
+      'facebook_link': 'https://www.facebook.com/artist%d' % i, 'seeking': rng.random() < 0.3,
+      'seeking_message': None,
+    })
+  insert(Artist, artists)
+
+  # a few popular venues and artists get a large share of the shows
+  shows = []
+  for i in range(num_shows):
+    shows.append({
+      'venue_id': min(int(rng.paretovariate(1.2)), num_venues) if rng.random() < 0.2 else rng.randint(1, num_venues),
+      'artist_id': min(int(rng.paretovariate(1.2)), num_artists) if rng.random() < 0.2 else rng.randint(1, num_artists),
+      'date': now + timedelta(hours=rng.randint(-24 * 240, 24 * 120)),
+    })
+  insert(Show, shows)
+
+  db.session.commit()
+  # rows went in through Core, so the show counters are computed in one pass
+  show_counters.rebuild()
+  return {'venues': num_venues, 'artists': num_artists, 'shows': num_shows}
@@ -0,0 +1,100 @@
+#----------------------------------------------------------------------------#
+# Import-time budget for app.py.
+#
+# Imports the app module in fresh interpreters and reports the wall-clock
+# time of `import app`, the modules it imports directly that cost the most
+# (from `python -X importtime`, whose own bookkeeping inflates its totals by
+# a third or more, so they only rank the modules) and the time create_app()
+# takes on top of it. Fails when the import exceeds the budget. Also run by
+# suite.py.
+#
+#   python benchmarks/import_time.py --budget 500
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import subprocess
+import sys
+
+rootdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# create_app() builds the engine, which imports the driver of DATABASE_URL;
+# like the other benchmarks, use SQLite unless told otherwise (nothing is
+# connected to, so the file is never created)
+env = dict(os.environ)
+env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(rootdir, 'benchmarks', 'bench.db'))
+
+IMPORT_APP = (
+  'import time; start = time.perf_counter(); import app; '
+  'print((time.perf_counter() - start) * 1000)'
+)
+
+CREATE_APP = (
+  'import time, app; start = time.perf_counter(); app.create_app(); '
+  'print((time.perf_counter() - start) * 1000)'
+)
+
+
+def importtime():
+  # {module: cumulative us} for `app` and the modules it imports directly.
+  # -X importtime prints a tree, children before their parent and indented
+  # by two more spaces
+  output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=rootdir, env=env,
+                          stderr=subprocess.PIPE, text=True, check=True).stderr
+  children = {}
+  for line in output.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    _, cumulative, name = line.split('|')
+    depth = (len(name) - len(name.lstrip()) - 1) // 2
+    if depth == 1:
+      children[name.strip()] = int(cumulative)
+    elif depth == 0:
+      if name.strip() == 'app':
+        return dict(children, app=int(cumulative))
+      children = {}
+  raise RuntimeError('app was not imported')
+
+
+def timed(code, runs):
+  # best of several runs in fresh interpreters; the first ones also warm the
+  # OS file cache
+  return min(
+    float(subprocess.check_output([sys.executable, '-c', code], cwd=rootdir, env=env, text=True).splitlines()[-1])
+    for i in range(runs)
+  )
+
+
+def measure(runs=5):
+  import_ms = timed(IMPORT_APP, runs)
+  create_app_ms = timed(CREATE_APP, runs)
+  best = min((importtime() for i in range(runs)), key=lambda modules: modules['app'])
+  heaviest = sorted(((us, name) for name, us in best.items() if name != 'app'), reverse=True)[:10]
+  return {
+    'import_ms': import_ms,
+    'create_app_ms': create_app_ms,
+    'heaviest': [{'module': name, 'ms': us / 1000.0} for us, name in heaviest],
+  }
+
+
+def report(result):
+  print('import app: %.1f ms, create_app(): %.1f ms' % (result['import_ms'], result['create_app_ms']))
+  for module in result['heaviest']:
+    print('  %-30s %8.1f ms' % (module['module'], module['ms']))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Measure the import time of the app against a budget.')
+  parser.add_argument('--budget', type=float, default=500, help='maximum milliseconds for `import app`')
+  parser.add_argument('--runs', type=int, default=5)
+  args = parser.parse_args()
+
+  result = measure(args.runs)
+  report(result)
+  if result['import_ms'] > args.budget:
+    print('OVER BUDGET import app takes %.1f ms, budget is %.1f ms' % (result['import_ms'], args.budget))
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,136 @@
+#----------------------------------------------------------------------------#
+# Load test comparing the WSGI server (app.run) with the ASGI entry point.
+#
+# Generates a data set, then for each mode starts the app in a child process
+# and, at each concurrency level, keeps that many clients requesting the
+# detail and show pages for a fixed time. Reports requests/sec, latency
+# percentiles and errors (refused, failed or timed out requests). The
+# client is a single asyncio process on the same machine, so point
+# DATABASE_URL at PostgreSQL and run on a box with spare cores for numbers
+# that mean something in production.
+#
+#   python benchmarks/load_async.py --scale 100k --clients 50,200,1000
+#----------------------------------------------------------------------------#
+
+import argparse
+import asyncio
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+MODES = ['wsgi', 'asgi']
+PORT = 5099
+
+
+def serve(mode, port):
+  import logging
+  from common import app
+
+  if mode == 'wsgi':
+    # the current way of running the app, without the per-request log lines
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app.run(host='127.0.0.1', port=port, threaded=True, debug=False, use_reloader=False)
+  else:
+    import uvicorn
+    from asgi import application
+    uvicorn.run(application, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+def wait_for(port, timeout=30):
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    try:
+      socket.create_connection(('127.0.0.1', port), timeout=1).close()
+      return
+    except OSError:
+      time.sleep(0.2)
+  raise RuntimeError('server on port %d did not start' % port)
+
+
+async def fetch(port, path):
+  reader, writer = await asyncio.open_connection('127.0.0.1', port)
+  try:
+    writer.write(('GET %s HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n' % path).encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    await reader.read()
+    return status
+  finally:
+    writer.close()
+
+
+async def load(port, urls, clients, duration, timeout):
+  latencies, errors = [], [0]
+  deadline = time.monotonic() + duration
+
+  async def client(offset):
+    i = offset
+    while time.monotonic() < deadline:
+      start = time.perf_counter()
+      try:
+        if await asyncio.wait_for(fetch(port, urls[i % len(urls)]), timeout) != 200:
+          errors[0] += 1
+        else:
+          latencies.append((time.perf_counter() - start) * 1000)
+      except (OSError, ValueError, IndexError, asyncio.TimeoutError):
+        errors[0] += 1
+      i += 1
+
+  await asyncio.gather(*[client(offset) for offset in range(clients)])
+  return latencies, errors[0]
+
+
+def percentile(values, q):
+  values = sorted(values)
+  return values[int(round(q * (len(values) - 1)))] if values else 0.0
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare the WSGI and ASGI serving modes under load.')
+  parser.add_argument('--scale', default='1k')
+  parser.add_argument('--clients', default='50,200,1000', help='comma-separated concurrency levels')
+  parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+  parser.add_argument('--timeout', type=float, default=10, help='seconds before a request counts as an error')
+  args = parser.parse_args()
+
+  from common import app, reset_db, cleanup
+  from datagen import SCALES, generate
+
+  with app.app_context():
+    reset_db()
+    counts = generate(SCALES[args.scale])
+
+  urls = []
+  for i in range(100):
+    urls += ['/venues/%d' % ((i * 7919) % counts['venues'] + 1), '/artists/%d' % ((i * 7919) % counts['artists'] + 1)]
+  urls.append('/shows')
+
+  # one socket per client
+  soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+  resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+  print('%-5s %8s %10s %9s %9s %9s %8s' % ('mode', 'clients', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+  for mode in MODES:
+    server = subprocess.Popen([sys.executable, __file__, '--serve', mode, str(PORT)])
+    try:
+      wait_for(PORT)
+      for clients in [int(value) for value in args.clients.split(',')]:
+        latencies, errors = asyncio.run(load(PORT, urls, clients, args.duration, args.timeout))
+        print('%-5s %8d %10.1f %9.2f %9.2f %9.2f %8d' % (
+          mode, clients, len(latencies) / args.duration, percentile(latencies, 0.50),
+          percentile(latencies, 0.95), percentile(latencies, 0.99), errors
+        ))
+    finally:
+      server.terminate()
+      server.wait()
+
+  cleanup()
+
+
+if __name__ == '__main__':
+  if sys.argv[1:2] == ['--serve']:
+    serve(sys.argv[2], int(sys.argv[3]))
+  else:
+    main()
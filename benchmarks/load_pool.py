@@ -0,0 +1,100 @@
+#----------------------------------------------------------------------------#
+# Load test showing how throughput changes with the connection pool settings.
+#
+# Seeds the database once, then for each (pool_size, max_overflow) pair runs
+# a child process whose worker threads hammer the read routes concurrently,
+# and reports requests/sec, errors and pool wait times from /__pool.
+# Point DATABASE_URL at PostgreSQL for numbers that mean something in
+# production. Run with "python benchmarks/load_pool.py [threads]".
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+SETTINGS = [(1, 0), (2, 0), (5, 0), (5, 10), (10, 20), (20, 0)]
+THREADS = 32
+REQUESTS_PER_THREAD = 50
+URLS = ['/venues', '/artists', '/shows', '/venues/1', '/artists/1']
+
+
+def seed():
+  from common import app, db, reset_db
+  from app import Venue, Artist, Show
+
+  with app.app_context():
+    reset_db()
+    now = datetime.now()
+    for i in range(200):
+      db.session.add_all([
+        Venue(name='Venue %d' % i, genres=['Jazz'], city='San Francisco', state='CA', address='1 Main St',
+              phone='123-123-1234', image_link='https://example.com/v.jpg'),
+        Artist(name='Artist %d' % i, genres=['Jazz'], city='San Francisco', state='CA',
+               phone='123-123-1234', image_link='https://example.com/a.jpg'),
+      ])
+    db.session.flush()
+    db.session.add_all([
+      Show(venue_id=i % 200 + 1, artist_id=i % 97 + 1, date=now + timedelta(hours=i - 1000))
+      for i in range(2000)
+    ])
+    db.session.commit()
+
+
+def worker(threads):
+  from common import app
+
+  client = app.test_client()
+  errors = []
+
+  def run():
+    for i in range(REQUESTS_PER_THREAD):
+      try:
+        response = client.get(URLS[i % len(URLS)])
+        if response.status_code != 200:
+          errors.append(response.status_code)
+      except Exception as error:
+        errors.append(repr(error))
+
+  pool = [threading.Thread(target=run) for _ in range(threads)]
+  start = time.perf_counter()
+  for thread in pool:
+    thread.start()
+  for thread in pool:
+    thread.join()
+  elapsed = time.perf_counter() - start
+
+  print(json.dumps({
+    'requests': threads * REQUESTS_PER_THREAD,
+    'elapsed': elapsed,
+    'errors': len(errors),
+    'pool': client.get('/__pool').get_json(),
+  }))
+
+
+def main():
+  threads = int(sys.argv[1]) if len(sys.argv) > 1 else THREADS
+  seed()
+
+  print('%5s %9s %10s %7s %12s %12s' % ('size', 'overflow', 'req/s', 'errors', 'avg wait ms', 'max wait ms'))
+  for pool_size, max_overflow in SETTINGS:
+    env = dict(os.environ, DB_POOL_SIZE=str(pool_size), DB_MAX_OVERFLOW=str(max_overflow), DB_POOL_TIMEOUT='5')
+    output = subprocess.check_output([sys.executable, __file__, '--worker', str(threads)], env=env)
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    print('%5d %9d %10.1f %7d %12.2f %12.2f' % (
+      pool_size, max_overflow, result['requests'] / result['elapsed'], result['errors'],
+      result['pool']['avg_wait_ms'], result['pool']['max_wait_ms']
+    ))
+
+  from common import cleanup
+  cleanup()
+
+
+if __name__ == '__main__':
+  if sys.argv[1:2] == ['--worker']:
+    worker(int(sys.argv[2]))
+  else:
+    main()
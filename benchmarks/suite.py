@@ -0,0 +1,217 @@
+#----------------------------------------------------------------------------#
+# Benchmark suite driving every route of the app.
+#
+# Generates a deterministic data set at the requested scale, then requests
+# each route through the Flask test client and reports p50/p95/p99 latency,
+# queries per request and the peak RSS of the process. Runs against SQLite by
+# default, or against PostgreSQL when DATABASE_URL points at one.
+#
+#   python benchmarks/suite.py --scale 1k
+#   python benchmarks/suite.py --scale 100k --json results.json
+#   python benchmarks/suite.py --scale 100k --baseline results.json
+#
+# Write routes have to flash their success message, anything else (a status
+# of 400 or more, an exception, an error flash) is counted as an error and
+# left out of the latencies and query counts, and any error fails the run.
+# With --baseline the run also fails when a route issues more queries than before
+# or its p95 grows by more than --tolerance, and so does a slower `import app`
+# (see import_time.py), which also has to stay within --import-budget.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+from flask import message_flashed
+
+from common import app, db, QueryCounter, reset_db, cleanup
+from datagen import SCALES, generate
+import import_time
+
+VENUE_FORM = {
+  'name': 'Benchmark Hall', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Main St',
+  'phone': '555-123-4567', 'genres': ['Jazz', 'Blues'], 'image_link': 'https://example.com/v.jpg',
+  'facebook_link': 'https://www.facebook.com/bench', 'website_link': 'https://example.com',
+  'seeking': 'Yes', 'seeking_message': 'Looking for local acts',
+}
+ARTIST_FORM = dict(VENUE_FORM, name='Benchmark Band')
+del ARTIST_FORM['address']
+
+TOUR_DATES = 20
+
+
+def tour(artist_id, venue, i):
+  # one artist over TOUR_DATES venues, on days no other iteration uses so no
+  # slot is ever double-booked
+  first = datetime(2031, 1, 1, 20) + timedelta(days=i * TOUR_DATES)
+  return {'shows': '\n'.join(
+    '%d, %d, %s' % (artist_id, venue(i + j), (first + timedelta(days=j)).strftime('%Y-%m-%d %H:%M'))
+    for j in range(TOUR_DATES)
+  )}
+
+
+def routes(counts):
+  # (name, method, url, form data) covering every route in app.py; ids cycle
+  # through the data set so popular and quiet entities are both hit
+  venue = lambda i: (i * 7919) % counts['venues'] + 1
+  artist = lambda i: (i * 7919) % counts['artists'] + 1
+  return [
+    ('index', 'GET', lambda i: '/', None),
+    ('venues', 'GET', lambda i: '/venues', None),
+    ('search_venues', 'POST', lambda i: '/venues/search', lambda i: {'search_term': ['hall', 'the', 'x'][i % 3]}),
+    ('show_venue', 'GET', lambda i: '/venues/%d' % venue(i), None),
+    ('create_venue_form', 'GET', lambda i: '/venues/create', None),
+    ('edit_venue', 'GET', lambda i: '/venues/%d/edit' % venue(i), None),
+    ('artists', 'GET', lambda i: '/artists', None),
+    ('search_artists', 'POST', lambda i: '/artists/search', lambda i: {'search_term': ['band', 'owl', 'x'][i % 3]}),
+    ('show_artist', 'GET', lambda i: '/artists/%d' % artist(i), None),
+    ('create_artist_form', 'GET', lambda i: '/artists/create', None),
+    ('edit_artist', 'GET', lambda i: '/artists/%d/edit' % artist(i), None),
+    ('shows', 'GET', lambda i: '/shows', None),
+    ('create_shows', 'GET', lambda i: '/shows/create', None),
+    # writes last, so they do not skew the read numbers
+    ('create_venue_submission', 'POST', lambda i: '/venues/create', lambda i: VENUE_FORM),
+    ('edit_venue_submission', 'POST', lambda i: '/venues/%d/edit' % venue(i), lambda i: VENUE_FORM),
+    ('create_artist_submission', 'POST', lambda i: '/artists/create', lambda i: ARTIST_FORM),
+    ('edit_artist_submission', 'POST', lambda i: '/artists/%d/edit' % artist(i), lambda i: ARTIST_FORM),
+    ('create_show_submission', 'POST', lambda i: '/shows/create',
+      lambda i: {'venue_id': venue(i), 'artist_id': artist(i), 'start_time': '2030-01-01 20:00:00'}),
+    ('create_show_batch_submission', 'POST', lambda i: '/shows/batch', lambda i: tour(artist(i), venue, i)),
+    ('delete_venue', 'DELETE', lambda i: '/venues/%d' % (counts['venues'] - i), None),
+    ('delete_artist', 'DELETE', lambda i: '/artists/%d' % (counts['artists'] - i), None),
+  ]
+
+
+def is_write(name):
+  return name.endswith('_submission') or name.startswith('delete_')
+
+
+def succeeded(name, response, flashes):
+  # a failed write still answers 200 with an error flash (or, for a batch,
+  # the form listing its errors), so writes have to report success
+  if response.status_code >= 400:
+    return False
+  if is_write(name):
+    return any('successfully' in message for message in flashes)
+  return True
+
+
+def percentile(values, q):
+  values = sorted(values)
+  return values[int(round(q * (len(values) - 1)))]
+
+
+def peak_rss_mb():
+  # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
+
+
+def run(scale, iterations):
+  client = app.test_client()
+  results = {}
+
+  with app.app_context():
+    dialect = db.engine.dialect.name
+    reset_db()
+    start = time.perf_counter()
+    counts = generate(SCALES[scale])
+    print('generated %(venues)d venues, %(artists)d artists, %(shows)d shows' % counts +
+          ' in %.1fs on %s' % (time.perf_counter() - start, dialect))
+
+    for name, method, url, data in routes(counts):
+      latencies, queries, errors = [], [], 0
+      for i in range(iterations):
+        flashes = []
+        record = lambda sender, message, category: flashes.append(message)
+        with QueryCounter() as counter, message_flashed.connected_to(record, app):
+          start = time.perf_counter()
+          try:
+            response = client.open(url(i), method=method, data=data(i) if data else None)
+            ok = succeeded(name, response, flashes)
+          except Exception:
+            db.session.rollback()
+            ok = False
+          elapsed = (time.perf_counter() - start) * 1000
+        if ok:
+          latencies.append(elapsed)
+          queries.append(counter.count)
+        else:
+          errors += 1
+
+      # a route failing every time has nothing to measure
+      latencies, queries = latencies or [0.0], queries or [0]
+      results[name] = {
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'queries': max(queries),
+        'errors': errors,
+      }
+
+  return {'scale': scale, 'dialect': dialect, 'peak_rss_mb': peak_rss_mb(), 'routes': results}
+
+
+def report(result):
+  print('%-30s %9s %9s %9s %8s %7s' % ('route', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'errors'))
+  for name, stats in result['routes'].items():
+    print('%-30s %9.2f %9.2f %9.2f %8d %7d' % (
+      name, stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['queries'], stats['errors']
+    ))
+  print('peak RSS: %.1f MB' % result['peak_rss_mb'])
+  import_time.report(result['import'])
+
+
+def regressions(result, baseline, tolerance):
+  found = []
+  for name, stats in result['routes'].items():
+    before = baseline['routes'].get(name)
+    if before is None:
+      continue
+    if stats['queries'] > before['queries']:
+      found.append('%s: %d queries per request, was %d' % (name, stats['queries'], before['queries']))
+    if stats['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+      found.append('%s: p95 %.2f ms, was %.2f ms' % (name, stats['p95_ms'], before['p95_ms']))
+  before = baseline.get('import')
+  if before and result['import']['import_ms'] > before['import_ms'] * (1 + tolerance):
+    found.append('import app: %.1f ms, was %.1f ms' % (result['import']['import_ms'], before['import_ms']))
+  return found
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark every route of the app.')
+  parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+  parser.add_argument('--iterations', type=int, default=20, help='requests per route')
+  parser.add_argument('--json', help='write the results to this file')
+  parser.add_argument('--baseline', help='compare against results written by an earlier --json run')
+  parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 growth over the baseline')
+  parser.add_argument('--import-budget', type=float, default=500, help='maximum milliseconds for `import app`')
+  args = parser.parse_args()
+
+  result = run(args.scale, args.iterations)
+  result['import'] = import_time.measure()
+  report(result)
+  cleanup()
+
+  if args.json:
+    with open(args.json, 'w') as f:
+      json.dump(result, f, indent=2)
+
+  found = ['%s: %d of %d requests failed' % (name, stats['errors'], args.iterations)
+           for name, stats in result['routes'].items() if stats['errors']]
+  if result['import']['import_ms'] > args.import_budget:
+    found.append('import app: %.1f ms, budget is %.1f ms' % (result['import']['import_ms'], args.import_budget))
+  if args.baseline:
+    with open(args.baseline) as f:
+      found += regressions(result, json.load(f), args.tolerance)
+  for line in found:
+    print('REGRESSION ' + line)
+  if found:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
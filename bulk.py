@@ -0,0 +1,298 @@
+import csv
+import io
+import json
+import sys
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+from werkzeug.datastructures import MultiDict
+
+data_cli = AppGroup('data', help='Bulk import and export of venues, artists and shows.')
+
+
+class Entity(object):
+    # how one model is read from files, validated and written back out
+
+    def __init__(self, model, form, columns, namespace, resolve=None, on_insert=None):
+        self.model = model
+        self.form = form
+        self.columns = columns
+        # cache namespace invalidated once an import has committed
+        self.namespace = namespace
+        self.resolve = resolve
+        # called with each chunk of inserted rows, in the same transaction
+        self.on_insert = on_insert
+
+
+def init_app(app, db, entities):
+    app.extensions['bulk'] = {'db': db, 'entities': entities}
+    app.cli.add_command(data_cli)
+
+
+def _extension():
+    return current_app.extensions['bulk']
+
+
+def _format(path, fmt):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    # yields (line number, dict) pairs without loading the file in memory
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=2):
+            yield number, row
+    else:
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                yield number, json.loads(line)
+
+
+def chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_formdata(row):
+    # multi-valued fields (genres) arrive as a JSON list or a ';'-separated string
+    formdata = MultiDict()
+    for key, value in row.items():
+        # exported shows carry their start time in the `date` column
+        if key == 'date':
+            key = 'start_time'
+        if isinstance(value, list):
+            formdata.setlist(key, [str(item) for item in value])
+        elif key == 'genres' and isinstance(value, str):
+            formdata.setlist(key, [item.strip() for item in value.split(';') if item.strip()])
+        elif isinstance(value, bool):
+            formdata[key] = 'Yes' if value else 'No'
+        elif value is not None:
+            formdata[key] = str(value)
+    return formdata
+
+
+def to_values(form, columns):
+    # form fields to column values, using the same conversions as the handlers
+    values = {}
+    for column in columns:
+        if column == 'date':
+            values['date'] = form.start_time.data
+        elif column == 'seeking':
+            values['seeking'] = form.seeking.data == 'Yes'
+        elif column in ('venue_id', 'artist_id'):
+            values[column] = int(getattr(form, column).data)
+        else:
+            values[column] = getattr(form, column).data or None
+    return values
+
+
+def resolve_show_references(db, entities, rows):
+    # shows may reference venues/artists by id or by name; every lookup is a
+    # single IN query per chunk instead of one query per row
+    errors = {}
+    for key, name_key, kind in (('venue_id', 'venue_name', 'venues'), ('artist_id', 'artist_name', 'artists')):
+        model = entities[kind].model
+        names = set(row[name_key] for _, row in rows if not row.get(key) and row.get(name_key))
+        by_name = dict(db.session.query(model.name, model.id).filter(model.name.in_(names))) if names else {}
+        for number, row in rows:
+            if not row.get(key) and row.get(name_key):
+                if row[name_key] in by_name:
+                    row[key] = by_name[row[name_key]]
+                else:
+                    errors.setdefault(number, 'unknown %s %r' % (name_key, row[name_key]))
+
+        ids = set(int(row[key]) for _, row in rows if str(row.get(key) or '').isdigit())
+        known = set(id for id, in db.session.query(model.id).filter(model.id.in_(ids))) if ids else set()
+        for number, row in rows:
+            if number not in errors and str(row.get(key) or '').isdigit() and int(row[key]) not in known:
+                errors[number] = 'unknown %s %s' % (key, row[key])
+    return errors
+
+
+# PostgreSQL drivers whose COPY support copy_rows() uses: psycopg 3's
+# cursor.copy() and psycopg2's cursor.copy_expert()
+COPY_DRIVERS = ('psycopg', 'psycopg2', 'psycopg2cffi')
+
+
+def copy_buffer(columns, rows):
+    # the rows as the CSV that COPY ... WITH (FORMAT csv) reads
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[column]) for column in columns])
+    buffer.seek(0)
+    return buffer
+
+
+def copy_rows(db, table, columns, rows):
+    # PostgreSQL COPY FROM STDIN, the fastest way in for large batches; each
+    # driver in COPY_DRIVERS has its own API for it
+    buffer = copy_buffer(columns, rows)
+    statement = 'COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)' % (table.name, ', '.join(columns))
+    connection = db.session.connection().connection
+    with connection.cursor() as cursor:
+        if db.session.get_bind().dialect.driver == 'psycopg':
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            cursor.copy_expert(statement, buffer)
+
+
+def _copy_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return '{%s}' % ','.join('"%s"' % item.replace('\\', '\\\\').replace('"', '\\"') for item in value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def insert_rows(db, entity, rows):
+    table = entity.model.__table__
+    # rows keeping the id they were exported with go in apart from the ones
+    # the database numbers
+    kept = [row for row in rows if 'id' in row]
+    for columns, group in ((['id'] + entity.columns, kept),
+                           (entity.columns, [row for row in rows if 'id' not in row])):
+        if not group:
+            continue
+        if db.session.get_bind().dialect.driver in COPY_DRIVERS:
+            copy_rows(db, table, columns, group)
+        else:
+            # one executemany per chunk, which SQLAlchemy batches into
+            # multi-row INSERTs; also the way in through PostgreSQL drivers
+            # without COPY
+            db.session.execute(table.insert(), group)
+    if kept:
+        advance_sequence(db, table)
+
+
+def advance_sequence(db, table):
+    # explicit ids bypass PostgreSQL's sequence, so it is moved past the
+    # largest id before it hands one of them out again; SQLite numbers new
+    # rows from the largest id already
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text(
+            "SELECT setval(pg_get_serial_sequence(:table, 'id'), max(id)) FROM \"%s\"" % table.name
+        ), {'table': table.name})
+
+
+@data_cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows validated and inserted per transaction.')
+@click.option('--strict', is_flag=True, help='Abort on the first invalid row instead of skipping it.')
+def import_command(kind, path, fmt, chunk_size, strict):
+    """Validate and insert rows from a CSV or JSONL file.
+
+    Rows with an id (as exported) keep it; rows without one are numbered by
+    the database.
+    """
+    db, entities = _extension()['db'], _extension()['entities']
+    entity = entities[kind]
+    imported = rejected = 0
+    start = time.perf_counter()
+
+    stream = sys.stdin if path == '-' else open(path, newline='')
+    try:
+        for chunk in chunks(read_rows(stream, _format(path, fmt)), chunk_size):
+            errors = entity.resolve(db, entities, chunk) if entity.resolve else {}
+            valid = []
+            for number, row in chunk:
+                if number not in errors:
+                    # exported rows keep their ids, so the shows exported
+                    # with them still point at the same venues and artists
+                    id = str(row.get('id') or '')
+                    if id and not id.isdigit():
+                        errors[number] = 'id: not a whole number'
+                        continue
+                    form = entity.form(formdata=to_formdata(row), meta={'csrf': False})
+                    if form.validate():
+                        values = to_values(form, entity.columns)
+                        if id:
+                            values['id'] = int(id)
+                        valid.append(values)
+                        continue
+                    errors[number] = '; '.join(
+                        '%s: %s' % (field, ', '.join(messages)) for field, messages in form.errors.items()
+                    )
+
+            for number in sorted(errors):
+                click.echo('line %d: %s' % (number, errors[number]), err=True)
+            if errors and strict:
+                db.session.rollback()
+                raise click.ClickException('invalid rows, nothing from this chunk was imported')
+
+            if valid:
+                insert_rows(db, entity, valid)
+                if entity.on_insert:
+                    entity.on_insert(valid)
+                db.session.commit()
+            imported += len(valid)
+            rejected += len(errors)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if imported and 'cache' in current_app.extensions:
+            current_app.extensions['cache'].invalidate(entity.namespace)
+
+    elapsed = time.perf_counter() - start
+    click.echo('imported %d %s, rejected %d, in %.1fs (%.0f rows/sec)' % (
+        imported, kind, rejected, elapsed, imported / elapsed if elapsed else 0))
+
+
+@data_cli.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(dir_okay=False, writable=True, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows fetched per round trip.')
+def export_command(kind, path, fmt, chunk_size):
+    """Stream every row to a CSV or JSONL file."""
+    db, entity = _extension()['db'], _extension()['entities'][kind]
+    fmt = _format(path, fmt)
+    columns = ['id'] + entity.columns
+    query = db.session.query(*[getattr(entity.model, column) for column in columns]).order_by(entity.model.id)
+    exported = 0
+    start = time.perf_counter()
+
+    stream = sys.stdout if path == '-' else open(path, 'w', newline='')
+    try:
+        writer = csv.writer(stream) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+        # yield_per keeps a server-side cursor open and only chunk_size rows in memory
+        for row in query.execution_options(yield_per=chunk_size):
+            values = dict(zip(columns, row))
+            if 'date' in values:
+                # the format ShowForm.start_time parses, so exports import back as-is
+                values['date'] = values['date'].strftime('%Y-%m-%d %H:%M:%S')
+            if writer:
+                # CSV cells use the same spellings as the forms
+                if 'genres' in values:
+                    values['genres'] = ';'.join(values['genres'])
+                if 'seeking' in values:
+                    values['seeking'] = 'Yes' if values['seeking'] else 'No'
+                writer.writerow([values[column] for column in columns])
+            else:
+                stream.write(json.dumps(values) + '\n')
+            exported += 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    elapsed = time.perf_counter() - start
+    click.echo('exported %d %s in %.1fs (%.0f rows/sec)' % (
+        exported, kind, elapsed, exported / elapsed if elapsed else 0), err=True)
@@ -0,0 +1,194 @@
+import pickle
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from functools import wraps
+from flask import has_request_context, request, session
+
+MISSING = object()
+
+
+def cacheable(value):
+    # a streamed response is rendered while it is sent, there is no body to keep
+    return not getattr(value, 'is_streamed', False)
+
+
+class MemoryBackend(object):
+    # in-process LRU with a per-entry TTL; namespace versions live apart from
+    # the entries so they are never evicted
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def version(self, namespace):
+        return self.versions.get(namespace, 0)
+
+    def incr(self, namespace):
+        with self.lock:
+            self.versions[namespace] = self.versions.get(namespace, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.versions.clear()
+
+
+class RedisBackend(object):
+    # shared backend for several workers; talks to any Redis-compatible server
+
+    def __init__(self, url, prefix='fyyur:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return MISSING if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def version(self, namespace):
+        return int(self.client.get(self.prefix + 'version:' + namespace) or 0)
+
+    def incr(self, namespace):
+        self.client.incr(self.prefix + 'version:' + namespace)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class NullBackend(object):
+    # caching disabled: every lookup misses
+
+    def get(self, key):
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def version(self, namespace):
+        return 0
+
+    def incr(self, namespace):
+        pass
+
+    def clear(self):
+        pass
+
+
+class Cache(object):
+    # read-through cache for query results and rendered pages. Entries depend
+    # on namespaces ('venue', 'venue:3', ...) whose version is part of the key,
+    # so writes invalidate by bumping a version instead of hunting down keys.
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.default_ttl = None
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend == 'memory':
+            self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        elif backend == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif backend == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError('Unknown CACHE_BACKEND %r' % backend)
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL')
+        app.extensions['cache'] = self
+
+    def key(self, name, depends_on=()):
+        versions = ','.join('%s=%d' % (namespace, self.backend.version(namespace)) for namespace in depends_on)
+        return '%s|%s' % (name, versions)
+
+    def fetch(self, name, creator, depends_on=(), ttl=None, keep=None):
+        # return the cached value for name, computing and storing it on a miss
+        # (unless keep(value) says otherwise)
+        key = self.key(name, depends_on)
+        value = self.backend.get(key)
+        if value is MISSING:
+            self.misses += 1
+            value = creator()
+            if keep is None or keep(value):
+                self.backend.set(key, value, ttl or self.default_ttl)
+        else:
+            self.hits += 1
+        return value
+
+    def invalidate(self, *namespaces):
+        if isinstance(self.backend, MemoryBackend) and not has_request_context():
+            # a CLI command only reaches its own process; each worker keeps
+            # serving what it cached until CACHE_DEFAULT_TTL runs out
+            warnings.warn('CACHE_BACKEND is memory, the running workers are not invalidated; '
+                          'use the redis backend to share invalidations across processes')
+        for namespace in namespaces:
+            self.backend.incr(namespace)
+
+    def cached_page(self, *depends_on):
+        # caches the rendered body of a GET view; namespaces may reference the
+        # view arguments, e.g. 'venue:{venue_id}'. Streamed responses pass
+        # through uncached.
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # pending flash messages are rendered into the page itself
+                if session.get('_flashes'):
+                    return view(*args, **kwargs)
+                namespaces = [namespace.format(**kwargs) for namespace in depends_on]
+                return self.fetch('page:' + request.full_path, lambda: view(*args, **kwargs), namespaces,
+                                  keep=cacheable)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self.backend.clear()
@@ -0,0 +1,213 @@
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+counters_cli = AppGroup('counters', help='Maintain the denormalized upcoming/past show counters.')
+
+
+class ShowCounters(object):
+    # upcoming_shows_count/past_shows_count on venues and artists, kept up to
+    # date as shows are added and removed instead of counted on every read.
+    # A show is counted as upcoming when it starts after the watermark stored
+    # in the state table; `flask counters rollover`, run from cron every few
+    # minutes, moves the shows that have started since then over to past and
+    # advances the watermark.
+
+    def __init__(self, app=None, db=None, venue=None, artist=None, show=None, state=None, on_recount=None):
+        if app is not None:
+            self.init_app(app, db, venue, artist, show, state, on_recount)
+
+    def init_app(self, app, db, venue, artist, show, state, on_recount=None):
+        self.db = db
+        self.show = show
+        self.state = state
+        # called before rollover() and rebuild() commit, for data derived
+        # from the counters
+        self.on_recount = on_recount
+        # each counted table with the show column pointing at it
+        self.targets = ((venue.__table__, show.venue_id), (artist.__table__, show.artist_id))
+        app.extensions['show_counters'] = self
+        app.cli.add_command(counters_cli)
+
+    def watermark(self, lock=False, read=False):
+        query = self.db.session.query(self.state.rolled_over_at).filter(self.state.id == 1)
+        if lock:
+            query = query.with_for_update(read=read)
+        value = query.scalar()
+        if value is None:
+            # a database built without the add_show_counters migration (e.g.
+            # by create_all) has no state row yet; like the migration, start
+            # counting from now
+            self._seed_watermark(datetime.now())
+            value = query.scalar()
+        return value
+
+    def _seed_watermark(self, value):
+        # concurrent first writers both try, the first insert wins
+        table = self.state.__table__
+        insert = postgresql.insert if self.db.session.get_bind().dialect.name == 'postgresql' else sqlite.insert
+        self.db.session.execute(
+            insert(table).values(id=1, rolled_over_at=value).on_conflict_do_nothing(index_elements=['id'])
+        )
+
+    def _set_watermark(self, value):
+        self.db.session.merge(self.state(id=1, rolled_over_at=value))
+
+    def add(self, shows):
+        # shows are (venue_id, artist_id, date) tuples; runs in the caller's
+        # transaction, which commits it along with the shows themselves.
+        # Returns the changes, see _apply()
+        return self._apply(shows, 1)
+
+    def remove_matching(self, *conditions):
+        # takes every show matching the conditions out of the counters. The
+        # database counts them, one grouped SELECT per table however many
+        # shows a deleted venue or artist had; returns the changes like add()
+        watermark = self.watermark(lock=True, read=True)
+        deltas = []
+        for table, key in self.targets:
+            gone = self.db.session.execute(select(
+                key,
+                func.count().filter(self.show.date > watermark),
+                func.count().filter(self.show.date <= watermark),
+            ).where(*conditions).group_by(key))
+            deltas.append(dict((id, [-upcoming, -past]) for id, upcoming, past in gone))
+        return self._update(deltas)
+
+    def _apply(self, shows, sign):
+        # a shared lock is enough to keep a concurrent rollover from moving
+        # the watermark until this transaction is done
+        watermark = self.watermark(lock=True, read=True)
+        deltas = [{}, {}]
+        for show in shows:
+            slot = 0 if show[2] > watermark else 1
+            for deltas_of, id in zip(deltas, show[:2]):
+                deltas_of.setdefault(id, [0, 0])[slot] += sign
+        return self._update(deltas)
+
+    def _update(self, deltas):
+        # one executemany UPDATE per table, whatever the number of shows;
+        # returns {table name: {id: [upcoming, past] change}}
+        for (table, _), deltas_of in zip(self.targets, deltas):
+            if deltas_of:
+                self.db.session.execute(
+                    table.update().where(table.c.id == bindparam('_id')).values(
+                        upcoming_shows_count=table.c.upcoming_shows_count + bindparam('_upcoming'),
+                        past_shows_count=table.c.past_shows_count + bindparam('_past'),
+                    ),
+                    [{'_id': id, '_upcoming': upcoming, '_past': past}
+                     for id, (upcoming, past) in deltas_of.items()]
+                )
+        return dict((table.name, deltas_of) for (table, _), deltas_of in zip(self.targets, deltas))
+
+    def rollover(self, now=None):
+        # moves shows that started since the watermark from upcoming to past,
+        # one grouped UPDATE per table over the ix_show_date range; returns
+        # the number of venue and artist rows that changed
+        now = now or datetime.now()
+        since = self.watermark(lock=True)
+        changed = 0
+        for table, key in self.targets:
+            due = select(
+                key.label('id'), func.count().label('shows')
+            ).where(
+                self.show.date > since, self.show.date <= now
+            ).group_by(key).subquery()
+            changed += self.db.session.execute(
+                table.update().where(table.c.id == due.c.id).values(
+                    upcoming_shows_count=table.c.upcoming_shows_count - due.c.shows,
+                    past_shows_count=table.c.past_shows_count + due.c.shows,
+                )
+            ).rowcount
+        self._set_watermark(now)
+        if changed and self.on_recount:
+            self.on_recount()
+        self.db.session.commit()
+        return changed
+
+    def check(self, now=None):
+        # (table, id, stored upcoming, stored past, actual upcoming, actual
+        # past) for every row whose counters disagree with the shows table as
+        # of now, so counters left behind by a missed rollover show up too
+        since = now or datetime.now()
+        mismatches = []
+        for table, key in self.targets:
+            upcoming = func.count(self.show.id).filter(self.show.date > since)
+            past = func.count(self.show.id).filter(self.show.date <= since)
+            rows = self.db.session.query(
+                table.c.id, table.c.upcoming_shows_count, table.c.past_shows_count, upcoming, past
+            ).outerjoin(
+                self.show, key == table.c.id
+            ).group_by(
+                table.c.id
+            ).having(
+                or_(table.c.upcoming_shows_count != upcoming, table.c.past_shows_count != past)
+            ).order_by(table.c.id)
+            mismatches.extend((table.name,) + tuple(row) for row in rows)
+        return mismatches
+
+    def rebuild(self, now=None):
+        # recounts every row from the shows table and resets the watermark
+        now = now or datetime.now()
+        self.watermark(lock=True)
+        for table, key in self.targets:
+            def counted(condition):
+                return select(func.count()).where(key == table.c.id, condition).scalar_subquery()
+            self.db.session.execute(table.update().values(
+                upcoming_shows_count=counted(self.show.date > now),
+                past_shows_count=counted(self.show.date <= now),
+            ))
+        self._set_watermark(now)
+        if self.on_recount:
+            self.on_recount()
+        self.db.session.commit()
+
+
+def _counters():
+    return current_app.extensions['show_counters']
+
+
+def _invalidate():
+    # listings and searches render the counters
+    if 'cache' in current_app.extensions:
+        current_app.extensions['cache'].invalidate('venue', 'artist')
+
+
+@counters_cli.command('rollover')
+def rollover_command():
+    """Move shows that have started from upcoming to past."""
+    changed = _counters().rollover()
+    if changed:
+        _invalidate()
+    click.echo('rolled over counters of %d venues and artists' % changed)
+
+
+@counters_cli.command('check')
+@click.option('--fix', is_flag=True, help='Rebuild every counter when a mismatch is found.')
+def check_command(fix):
+    """Compare the counters with the shows table."""
+    mismatches = _counters().check()
+    for table, id, upcoming, past, actual_upcoming, actual_past in mismatches:
+        click.echo('%s %d: upcoming %d (actual %d), past %d (actual %d)' % (
+            table, id, upcoming, actual_upcoming, past, actual_past), err=True)
+    if not mismatches:
+        click.echo('counters are consistent')
+    elif fix:
+        _counters().rebuild()
+        _invalidate()
+        click.echo('rebuilt counters after %d mismatches' % len(mismatches))
+    else:
+        # shows that started since the last rollover are reported too
+        raise click.ClickException('%d mismatched rows, run with --fix to rebuild (or check that '
+                                   '`flask counters rollover` is scheduled)' % len(mismatches))
+
+
+@counters_cli.command('rebuild')
+def rebuild_command():
+    """Recount every counter from the shows table."""
+    _counters().rebuild()
+    _invalidate()
+    click.echo('rebuilt counters')
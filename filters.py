@@ -0,0 +1,43 @@
+from datetime import datetime
+from functools import lru_cache
+
+# babel and dateutil are imported on first use, they are only needed once a
+# page renders a date
+
+# named formats understood by the `datetime` template filter
+FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+@lru_cache(maxsize=None)
+def compile_format(format, locale=None):
+    # babel parses the pattern and the locale on every format_datetime call;
+    # both only depend on (format, locale), so they are parsed once here
+    from babel import Locale
+    from babel.dates import LC_TIME, parse_pattern
+    return parse_pattern(FORMATS.get(format, format)), Locale.parse(locale or LC_TIME)
+
+def to_datetime(value):
+    # real datetimes pass straight through, ISO strings (what str() gives for
+    # a datetime) take the fast path and anything else falls back to dateutil
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        import dateutil.parser
+        return dateutil.parser.parse(value)
+
+def format_datetime(value, format='medium', locale=None):
+    pattern, locale = compile_format(format, locale)
+    return pattern.apply(to_datetime(value), locale)
+
+def cached_format_datetime(maxsize=4096):
+    # optional LRU in front of format_datetime, keyed on the (timestamp, format)
+    # pair; pages listing many shows at the same time slots render each once
+    @lru_cache(maxsize=maxsize)
+    def format_cached(value, format='medium'):
+        return format_datetime(value, format)
+
+    return format_cached
@@ -1,9 +1,9 @@
 from datetime import datetime
-from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, TextAreaField
+from flask_wtf import FlaskForm
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, TextAreaField, HiddenField
 from wtforms.validators import DataRequired, AnyOf, URL, Length
 
-class ShowForm(Form):
+class ShowForm(FlaskForm):
     artist_id = StringField(
         'artist_id', validators=[DataRequired()]
     )
@@ -16,7 +16,13 @@ class ShowForm(Form):
         default=datetime.today()
     )
 
-class VenueForm(Form):
+class ShowBatchForm(FlaskForm):
+    # one "artist_id, venue_id, start time" per line, e.g. the dates of a tour
+    shows = TextAreaField(
+        'shows', render_kw={"rows": 15}, validators=[DataRequired()]
+    )
+
+class VenueForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -128,8 +134,10 @@ class VenueForm(Form):
     seeking_message = TextAreaField(
         'seeking_message', render_kw={"rows": 5}, validators=[Length(max=500)]
     )
+    # row version the edit form was filled from, empty when creating
+    version = HiddenField('version')
 
-class ArtistForm(Form):
+class ArtistForm(FlaskForm):
     name = StringField(
         'name', validators=[DataRequired()]
     )
@@ -237,4 +245,5 @@ class ArtistForm(Form):
     )
     seeking_message = TextAreaField(
         'seeking_message', render_kw={"rows": 5}, validators=[Length(max=500)]
-    )
\ No newline at end of file
+    )
+    version = HiddenField('version')
\ No newline at end of file
@@ -0,0 +1,46 @@
+import click
+
+
+class LazyGroup(click.Group):
+    # stands in for a command group that is only loaded once it is invoked
+    # (the real group then parses the arguments and runs its own callback)
+    # or its commands are listed
+
+    def __init__(self, name, load, **kwargs):
+        super().__init__(name, **kwargs)
+        self.load = load
+        self.group = None
+
+    def _group(self):
+        if self.group is None:
+            self.group = self.load()
+        return self.group
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return self._group().make_context(info_name, args, parent=parent, **extra)
+
+    def list_commands(self, ctx):
+        return self._group().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._group().get_command(ctx, name)
+
+
+class LazyMigrate(object):
+    # Migrate(app, db) for the `flask db` commands, without importing
+    # flask_migrate (and alembic, the largest import of the app) until one of
+    # them actually runs; servers and the other commands never need it
+
+    def __init__(self, app=None, db=None, **kwargs):
+        self.kwargs = kwargs
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.cli.add_command(LazyGroup('db', lambda: self.load(app, db), help='Perform database migrations.'))
+
+    def load(self, app, db):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_cli
+        Migrate(app, db, **self.kwargs)
+        return db_cli
@@ -0,0 +1,29 @@
+"""Add indexes for show and venue lookups
+
+Revision ID: 5d9a2f61c8e4
+Revises: b3e41c7d2a90
+Create Date: 2026-10-17 11:03:27.904512
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9a2f61c8e4'
+down_revision = 'b3e41c7d2a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_venue_id_date', 'show', ['venue_id', 'date'], unique=False)
+    op.create_index('ix_show_artist_id_date', 'show', ['artist_id', 'date'], unique=False)
+    op.create_index('ix_show_date', 'show', ['date'], unique=False)
+    op.create_index('ix_venue_state_city', 'venue', ['state', 'city'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venue_state_city', table_name='venue')
+    op.drop_index('ix_show_date', table_name='show')
+    op.drop_index('ix_show_artist_id_date', table_name='show')
+    op.drop_index('ix_show_venue_id_date', table_name='show')
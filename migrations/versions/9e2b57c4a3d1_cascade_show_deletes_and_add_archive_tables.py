@@ -0,0 +1,84 @@
+"""Cascade show deletes from venue and artist, add the archive tables
+
+Revision ID: 9e2b57c4a3d1
+Revises: f1c7a93e5d28
+Create Date: 2026-10-17 22:04:18.512730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9e2b57c4a3d1'
+down_revision = 'f1c7a93e5d28'
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [
+    ('show_venue_id_fkey', 'venue_id', 'venue'),
+    ('show_artist_id_fkey', 'artist_id', 'artist'),
+]
+
+
+def listing_columns():
+    return [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('seeking', sa.Boolean(), nullable=False),
+        sa.Column('seeking_message', sa.String(length=500), nullable=True),
+        sa.Column('genres', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('city', sa.String(length=120), nullable=False),
+        sa.Column('state', sa.String(length=120), nullable=False),
+    ]
+
+
+def contact_columns():
+    return [
+        sa.Column('phone', sa.String(length=120), nullable=False),
+        sa.Column('website_link', sa.String(length=120), nullable=True),
+        sa.Column('image_link', sa.String(length=500), nullable=False),
+        sa.Column('facebook_link', sa.String(length=120), nullable=True),
+        sa.Column('upcoming_shows_count', sa.Integer(), nullable=False),
+        sa.Column('past_shows_count', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+    ]
+
+
+def create_archive_table(table, *columns):
+    # no keys: an id may be archived more than once
+    name = table + '_archive'
+    op.create_table(name, *columns, sa.Column('archived_at', sa.DateTime(), nullable=False))
+    op.create_index('ix_%s_id' % name, name, ['id'], unique=False)
+    op.create_index('ix_%s_archived_at' % name, name, ['archived_at'], unique=False)
+
+
+def replace_foreign_keys(**kwargs):
+    # on the partitioned show table the constraints of its partitions follow
+    # those of the parent
+    for name, column, table in FOREIGN_KEYS:
+        op.drop_constraint(name, 'show', type_='foreignkey')
+        op.create_foreign_key(name, 'show', table, [column], ['id'], **kwargs)
+
+
+def upgrade():
+    # deleting a venue or an artist deletes its shows in the database,
+    # without the app loading them first
+    replace_foreign_keys(ondelete='CASCADE')
+
+    create_archive_table('venue', *listing_columns() + [sa.Column('address', sa.String(length=120), nullable=False)]
+                         + contact_columns())
+    create_archive_table('artist', *listing_columns() + contact_columns())
+    create_archive_table('show',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    for table in ('show', 'artist', 'venue'):
+        op.drop_table(table + '_archive')
+    replace_foreign_keys()
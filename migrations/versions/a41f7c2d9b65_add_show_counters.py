@@ -0,0 +1,45 @@
+"""Add precomputed upcoming/past show counters to venue and artist
+
+Revision ID: a41f7c2d9b65
+Revises: e07c8b94d1f3
+Create Date: 2026-10-17 18:02:41.583120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f7c2d9b65'
+down_revision = 'e07c8b94d1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table('show_counter_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_over_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # count the existing shows against the same instant used as the watermark
+    op.execute("INSERT INTO show_counter_state (id, rolled_over_at) VALUES (1, LOCALTIMESTAMP)")
+    for table in ('venue', 'artist'):
+        op.execute(
+            'UPDATE {table} SET '
+            'upcoming_shows_count = (SELECT count(*) FROM show WHERE show.{table}_id = {table}.id '
+            'AND show.date > (SELECT rolled_over_at FROM show_counter_state)), '
+            'past_shows_count = (SELECT count(*) FROM show WHERE show.{table}_id = {table}.id '
+            'AND show.date <= (SELECT rolled_over_at FROM show_counter_state))'.format(table=table)
+        )
+
+
+def downgrade():
+    op.drop_table('show_counter_state')
+    for table in ('venue', 'artist'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
@@ -0,0 +1,36 @@
+"""Add the materialized city/state area directory
+
+Revision ID: c5e1d0a7f342
+Revises: a41f7c2d9b65
+Create Date: 2026-10-17 19:14:08.207351
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1d0a7f342'
+down_revision = 'a41f7c2d9b65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('area',
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('num_venues', sa.Integer(), nullable=False),
+    sa.Column('num_upcoming_shows', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('state', 'city')
+    )
+
+    op.execute(
+        'INSERT INTO area (state, city, num_venues, num_upcoming_shows) '
+        'SELECT state, city, count(*), coalesce(sum(upcoming_shows_count), 0) '
+        'FROM venue GROUP BY state, city'
+    )
+
+
+def downgrade():
+    op.drop_table('area')
@@ -0,0 +1,100 @@
+"""Range-partition show by month on PostgreSQL
+
+Revision ID: d8a4f2b61e07
+Revises: c5e1d0a7f342
+Create Date: 2026-10-17 20:31:52.904118
+
+"""
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4f2b61e07'
+down_revision = 'c5e1d0a7f342'
+branch_labels = None
+depends_on = None
+
+# months created past the current one; `flask partitions create` keeps
+# extending them
+MONTHS_AHEAD = 12
+
+INDEXES = [
+    ('ix_show_venue_id_date', ['venue_id', 'date']),
+    ('ix_show_artist_id_date', ['artist_id', 'date']),
+    ('ix_show_date', ['date']),
+]
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def create_show_table(*constraints, **kwargs):
+    op.create_table('show',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('show_id_seq')"), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ),
+    *constraints,
+    **kwargs
+    )
+    for name, columns in INDEXES:
+        op.create_index(name, 'show', columns, unique=False)
+
+
+def set_aside_show_table():
+    # renames show out of the way, along with the names its replacement reuses
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY NONE')
+    op.rename_table('show', 'show_old')
+    for constraint in ('show_pkey', 'show_venue_id_fkey', 'show_artist_id_fkey'):
+        op.execute('ALTER TABLE show_old DROP CONSTRAINT %s' % constraint)
+    for name, columns in INDEXES:
+        op.drop_index(name, table_name='show_old')
+
+
+def move_shows():
+    op.execute('INSERT INTO show (id, date, venue_id, artist_id) SELECT id, date, venue_id, artist_id FROM show_old')
+    op.drop_table('show_old')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY show.id')
+
+
+def upgrade():
+    # upcoming-show queries then only scan the partitions of the months they
+    # ask for. The primary key of a partitioned table has to include the
+    # partition key, so it becomes (id, date); ids still come from the same
+    # sequence. SQLite keeps its plain table, ix_show_date serves the ranges.
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    first, last = bind.execute(sa.text('SELECT min(date), max(date) FROM show')).one()
+    today = date.today()
+    month = (first.date() if first else today).replace(day=1)
+    end = (last.date() if last and last.date() > today else today).replace(day=1)
+    for i in range(MONTHS_AHEAD + 1):
+        end = next_month(end)
+
+    set_aside_show_table()
+    create_show_table(sa.PrimaryKeyConstraint('id', 'date'), postgresql_partition_by='RANGE (date)')
+    while month < end:
+        op.execute("CREATE TABLE show_y%04dm%02d PARTITION OF show FOR VALUES FROM ('%s') TO ('%s')"
+                   % (month.year, month.month, month.isoformat(), next_month(month).isoformat()))
+        month = next_month(month)
+    # anything outside the months created so far
+    op.execute('CREATE TABLE show_default PARTITION OF show DEFAULT')
+    move_shows()
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # dropping the partitioned table drops every partition with it
+    set_aside_show_table()
+    create_show_table(sa.PrimaryKeyConstraint('id'))
+    move_shows()
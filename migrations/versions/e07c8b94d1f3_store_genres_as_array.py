@@ -0,0 +1,36 @@
+"""Store venue and artist genres as a varchar array
+
+Revision ID: e07c8b94d1f3
+Revises: 5d9a2f61c8e4
+Create Date: 2026-10-17 11:48:05.316290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'e07c8b94d1f3'
+down_revision = '5d9a2f61c8e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing values were written as array literals ('{Jazz,"Rock n Roll"}'),
+    # so a cast converts them in place
+    for table in ('venue', 'artist'):
+        op.alter_column(table, 'genres', type_=postgresql.ARRAY(sa.String()),
+                        existing_type=sa.String(), existing_nullable=False,
+                        postgresql_using='genres::varchar[]')
+    op.create_index('ix_venue_genres', 'venue', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_artist_genres', 'artist', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_artist_genres', table_name='artist')
+    op.drop_index('ix_venue_genres', table_name='venue')
+    for table in ('venue', 'artist'):
+        op.alter_column(table, 'genres', type_=sa.String(),
+                        existing_type=postgresql.ARRAY(sa.String()), existing_nullable=False,
+                        postgresql_using='genres::varchar')
@@ -0,0 +1,26 @@
+"""Add a row version to venue and artist for optimistic concurrency
+
+Revision ID: f1c7a93e5d28
+Revises: d8a4f2b61e07
+Create Date: 2026-10-17 21:12:40.377915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7a93e5d28'
+down_revision = 'd8a4f2b61e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    for table in ('venue', 'artist'):
+        op.drop_column(table, 'version')
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+partitions_cli = AppGroup('partitions', help='Maintain the monthly partitions of the show table.')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table, month):
+    return '%s_y%04dm%02d' % (table, month.year, month.month)
+
+
+class ShowPartitions(object):
+    # monthly range partitions of `show` on PostgreSQL, set up by the
+    # partition_show_by_month migration. Months are created ahead of time
+    # (`flask partitions create`, from cron) so new shows land in their own
+    # month rather than in the default partition; rows already sitting in the
+    # default partition are moved into the month created for them. Other
+    # databases keep a plain table.
+
+    def __init__(self, app=None, db=None, table='show'):
+        self.table = table
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.db = db
+        self.months_ahead = app.config['SHOW_PARTITION_MONTHS_AHEAD']
+        app.extensions['show_partitions'] = self
+        app.cli.add_command(partitions_cli)
+
+    def is_partitioned(self):
+        if self.db.session.get_bind().dialect.name != 'postgresql':
+            return False
+        return self.db.session.execute(text(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = :table AND pg_table_is_visible(c.oid))'
+        ), {'table': self.table}).scalar()
+
+    def partitions(self):
+        return set(self.db.session.execute(text(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table AND pg_table_is_visible(p.oid)'
+        ), {'table': self.table}).scalars())
+
+    def create(self, months_ahead=None, today=None):
+        # creates the missing months from the current one to months_ahead
+        # later, in the caller's transaction; returns their names
+        months_ahead = self.months_ahead if months_ahead is None else months_ahead
+        existing = self.partitions()
+        month = month_start(today or date.today())
+        created = []
+        for i in range(months_ahead + 1):
+            name = partition_name(self.table, month)
+            if name not in existing:
+                self.attach(name, month, next_month(month))
+                created.append(name)
+            month = next_month(month)
+        return created
+
+    def attach(self, name, start, end):
+        # the month is filled from the default partition before it is
+        # attached, attaching it over rows left there would fail
+        session = self.db.session
+        table, default = self.table, self.table + '_default'
+        session.execute(text('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)' % (name, table)))
+        session.execute(text(
+            'WITH moved AS (DELETE FROM %s WHERE date >= :start AND date < :end RETURNING id, date, venue_id, '
+            'artist_id) INSERT INTO %s (id, date, venue_id, artist_id) SELECT id, date, venue_id, artist_id '
+            'FROM moved' % (default, name)
+        ), {'start': start, 'end': end})
+        session.execute(text("ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM ('%s') TO ('%s')"
+                             % (table, name, start.isoformat(), end.isoformat())))
+
+
+@partitions_cli.command('create')
+@click.option('--months', type=int, default=None, help='Months ahead to create (SHOW_PARTITION_MONTHS_AHEAD).')
+def create_command(months):
+    """Create the monthly show partitions of the coming months."""
+    show_partitions = current_app.extensions['show_partitions']
+    if not show_partitions.is_partitioned():
+        click.echo('%s is not partitioned, nothing to do' % show_partitions.table)
+        return
+    created = show_partitions.create(months)
+    show_partitions.db.session.commit()
+    click.echo('created %d partitions%s' % (len(created), (': ' + ', '.join(created)) if created else ''))
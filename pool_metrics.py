@@ -0,0 +1,142 @@
+import bisect
+import threading
+import time
+from flask import appcontext_pushed, current_app
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+# upper bounds (ms) of the checkout latency histogram buckets
+LATENCY_BUCKETS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+
+class PoolMetrics(object):
+    # counters and a checkout latency histogram shared by every pool of the
+    # process; gauges (checked out, overflow) are read from the pool itself
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record_checkout(self, elapsed):
+        with self.lock:
+            self.checkouts += 1
+            self.wait_time += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS, elapsed * 1000)] += 1
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+
+    def record_connect(self):
+        with self.lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self.lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool=None):
+        with self.lock:
+            data = {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_time_ms': round(self.wait_time * 1000, 3),
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'avg_wait_ms': round(self.wait_time * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                # (bucket, count) pairs, in bucket order
+                'checkout_latency_ms': [
+                    ['<=%d' % bound, count] for bound, count in zip(LATENCY_BUCKETS, self.histogram)
+                ] + [['>%d' % LATENCY_BUCKETS[-1], self.histogram[-1]]],
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return data
+
+
+metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool timing how long each checkout waits for a connection
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super(InstrumentedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            metrics.record_timeout()
+            raise
+        finally:
+            metrics.record_checkout(time.perf_counter() - start)
+
+
+def configure(app):
+    # must run before the engine is created. Only databases the dialect would
+    # give a QueuePool get the instrumented one; others (in-memory SQLite
+    # uses a SingletonThreadPool) keep their pool and lose the QueuePool
+    # sizing options, which their pool does not take
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        options.setdefault('poolclass', InstrumentedQueuePool)
+    else:
+        for option in QUEUE_POOL_OPTIONS:
+            options.pop(option, None)
+
+
+def on_engine(app, db, attach):
+    # calls attach(db.engine) once, as the first app context is pushed (by a
+    # request or a CLI command, before either can connect), instead of
+    # reaching for the engine while the app is being created
+    lock = threading.Lock()
+    pending = [attach]
+
+    def attach_once(sender, **extra):
+        if pending:
+            with lock:
+                if pending:
+                    pending.pop()(db.engine)
+
+    appcontext_pushed.connect(attach_once, app, weak=False)
+
+
+def init_app(app, db):
+    def on_connect(dbapi_connection, connection_record):
+        metrics.record_connect()
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record_invalidation()
+
+    def attach(engine):
+        event.listen(engine, 'connect', on_connect)
+        event.listen(engine, 'invalidate', on_invalidate)
+
+    on_engine(app, db, attach)
+
+    interval = app.config.get('POOL_METRICS_LOG_INTERVAL')
+    if interval:
+        last_emit = [time.monotonic()]
+
+        @app.teardown_request
+        def emit_pool_metrics(exc):
+            # piggybacks on request teardown instead of running a thread
+            if time.monotonic() - last_emit[0] >= interval:
+                last_emit[0] = time.monotonic()
+                current_app.logger.info('pool metrics %s', metrics.snapshot(db.engine.pool))
@@ -0,0 +1,163 @@
+import json
+import random
+import re
+import threading
+import time
+from flask import g, has_request_context, request, request_started, request_finished, \
+    before_render_template, template_rendered
+from sqlalchemy import event
+from pool_metrics import on_engine
+
+# literals that vary between otherwise identical statements
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'\bIN\s*\((?:\s*\?\s*,?|\s*%\(\w+\)s\s*,?)+\)', re.IGNORECASE)
+
+
+def statement_shape(statement):
+    # collapses literals and IN lists so repeated lookups compare equal
+    shape = LITERALS.sub('?', statement)
+    shape = IN_LISTS.sub('IN (...)', shape)
+    return ' '.join(shape.split())
+
+
+class RequestProfile(object):
+    __slots__ = ('start', 'queries', 'sql_time', 'render_time', 'render_start', 'shapes')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = []
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.render_start = None
+        self.shapes = {}
+
+    def add_query(self, statement, elapsed):
+        self.queries.append((elapsed, statement))
+        self.sql_time += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+
+class EndpointStats(object):
+    __slots__ = ('requests', 'queries', 'sql_time', 'render_time', 'total_time', 'slowest', 'n_plus_one')
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self.slowest = []
+        self.n_plus_one = {}
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'avg_queries': round(self.queries / requests, 2),
+            'avg_sql_ms': round(self.sql_time * 1000 / requests, 3),
+            'avg_render_ms': round(self.render_time * 1000 / requests, 3),
+            'avg_total_ms': round(self.total_time * 1000 / requests, 3),
+            'slowest_queries': [{'ms': round(elapsed * 1000, 3), 'statement': statement}
+                                for elapsed, statement in self.slowest],
+            'n_plus_one': [{'statement': shape, 'max_repeats': repeats}
+                           for shape, repeats in sorted(self.n_plus_one.items(), key=lambda item: -item[1])],
+        }
+
+
+class Profiler(object):
+    # per-request SQL and template timing aggregated per endpoint. Only a
+    # sample of requests is profiled so it can stay on in production.
+
+    def __init__(self, app=None, db=None):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.sample_rate = app.config.get('PROFILING_SAMPLE_RATE', 1.0)
+        self.n_plus_one_threshold = app.config.get('PROFILING_N_PLUS_ONE_THRESHOLD', 10)
+        self.slowest_kept = app.config.get('PROFILING_SLOWEST_QUERIES', 5)
+        self.log = app.config.get('PROFILING_LOG', True)
+
+        on_engine(app, db, self.watch)
+        request_started.connect(self._request_started, app)
+        request_finished.connect(self._request_finished, app)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._rendered, app)
+        app.extensions['profiler'] = self
+
+    def watch(self, engine):
+        # also used for the async engine (its sync_engine), see async_db.py
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _current(self):
+        return g.get('_profile') if has_request_context() else None
+
+    def _request_started(self, sender, **extra):
+        if random.random() < self.sample_rate:
+            g._profile = RequestProfile()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current() is not None:
+            conn.info.setdefault('_profile_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = self._current()
+        if profile is not None and conn.info.get('_profile_start'):
+            profile.add_query(statement, time.perf_counter() - conn.info['_profile_start'].pop())
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = self._current()
+        if profile is not None:
+            profile.render_start = time.perf_counter()
+
+    def _rendered(self, sender, template, context, **extra):
+        # the time between the two signals also includes SQL issued from the
+        # template (lazy loads), which is what makes those visible
+        profile = self._current()
+        if profile is not None and profile.render_start is not None:
+            profile.render_time += time.perf_counter() - profile.render_start
+            profile.render_start = None
+
+    def _request_finished(self, sender, response, **extra):
+        profile = self._current()
+        if profile is None:
+            return
+        endpoint = request.endpoint or request.path
+        total_time = time.perf_counter() - profile.start
+        repeated = dict((shape, count) for shape, count in profile.shapes.items()
+                        if count > self.n_plus_one_threshold)
+
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.queries += len(profile.queries)
+            stats.sql_time += profile.sql_time
+            stats.render_time += profile.render_time
+            stats.total_time += total_time
+            stats.slowest = sorted(stats.slowest + profile.queries, reverse=True)[:self.slowest_kept]
+            for shape, count in repeated.items():
+                stats.n_plus_one[shape] = max(stats.n_plus_one.get(shape, 0), count)
+
+        if self.log:
+            sender.logger.info('perf %s', json.dumps({
+                'endpoint': endpoint,
+                'method': request.method,
+                'status': response.status_code,
+                'queries': len(profile.queries),
+                'sql_ms': round(profile.sql_time * 1000, 3),
+                'render_ms': round(profile.render_time * 1000, 3),
+                'total_ms': round(total_time * 1000, 3),
+                'n_plus_one': sorted(repeated.values(), reverse=True),
+            }))
+
+    def report(self):
+        with self.lock:
+            return dict((endpoint, stats.as_dict()) for endpoint, stats in self.endpoints.items())
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
@@ -0,0 +1,88 @@
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import BytecodeCache, FileSystemBytecodeCache
+
+templates_cli = AppGroup('templates', help='Precompile the Jinja templates.')
+
+
+class MemoryBytecodeCache(BytecodeCache):
+    # compiled templates held by this process; filled at startup by preload(),
+    # so workers forked afterwards inherit them copy-on-write
+
+    def __init__(self):
+        self.buckets = {}
+
+    def load_bytecode(self, bucket):
+        code = self.buckets.get(bucket.key)
+        if code is not None:
+            bucket.bytecode_from_string(code)
+
+    def dump_bytecode(self, bucket):
+        self.buckets[bucket.key] = bucket.bytecode_to_string()
+
+    def clear(self):
+        self.buckets.clear()
+
+
+class TemplateCache(object):
+    # puts a bytecode cache behind app.jinja_env and optionally compiles every
+    # template at startup, so the first request to each route does not pay
+    # for parsing and compiling its templates. Must be set up after the
+    # template filters are registered, templates are checked against them.
+
+    def __init__(self, app=None):
+        self.bytecode_cache = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        backend = app.config['TEMPLATE_BYTECODE_CACHE']
+        if backend == 'filesystem':
+            self.bytecode_cache = FileSystemBytecodeCache(self.directory())
+        elif backend == 'memory':
+            self.bytecode_cache = MemoryBytecodeCache()
+        elif backend != 'null':
+            raise ValueError('unknown TEMPLATE_BYTECODE_CACHE %r' % backend)
+        app.jinja_env.bytecode_cache = self.bytecode_cache
+        app.extensions['template_cache'] = self
+        app.cli.add_command(templates_cli)
+        if app.config['TEMPLATE_PRELOAD']:
+            self.preload()
+
+    def directory(self):
+        directory = self.app.config['TEMPLATE_CACHE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def template_names(self):
+        # pages/home.css lives next to the templates but is not one
+        return self.app.jinja_env.list_templates(extensions=['html'])
+
+    def preload(self):
+        # loads every template into the environment's template cache, going
+        # through (and filling) the bytecode cache
+        names = self.template_names()
+        for name in names:
+            self.app.jinja_env.get_template(name)
+        return names
+
+
+@templates_cli.command('compile')
+def compile_command():
+    """Write the bytecode of every template to TEMPLATE_CACHE_DIR."""
+    template_cache = current_app.extensions['template_cache']
+    env = current_app.jinja_env
+    bytecode_cache = FileSystemBytecodeCache(template_cache.directory())
+    # the build step always writes files, whatever cache the app runs with
+    previous, env.bytecode_cache = env.bytecode_cache, bytecode_cache
+    try:
+        bytecode_cache.clear()
+        if env.cache is not None:
+            env.cache.clear()
+        names = template_cache.preload()
+    finally:
+        env.bytecode_cache = previous
+    click.echo('compiled %d templates into %s' % (len(names), current_app.config['TEMPLATE_CACHE_DIR']))
@@ -0,0 +1,109 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+db_path = os.path.join(basedir, 'test.db')
+
+# the tests run against a throwaway SQLite database, uncached and unprofiled
+os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+os.environ['CACHE_BACKEND'] = 'null'
+os.environ['PROFILING_ENABLED'] = 'false'
+sys.path.insert(0, os.path.dirname(basedir))
+
+from app import create_app, db, async_db, area_directory, Venue, Artist
+
+_app = create_app()
+# the forms are posted without fetching their CSRF token first
+_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+
+
+@pytest.fixture
+def app():
+    with _app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield _app
+    with _app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cleanup():
+    yield
+    with _app.app_context():
+        db.engine.dispose()
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class QueryCounter(object):
+    # records every statement sent to the database while active, through the
+    # sync engine or the async lookups' engine
+
+    def __init__(self):
+        self.statements = []
+        self.parameters = []
+
+    def __enter__(self):
+        for engine in (db.engine, async_db.engine.sync_engine):
+            event.listen(engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in (db.engine, async_db.engine.sync_engine):
+            event.remove(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, *args):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+VENUE = {
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+    'phone': '123-123-1234', 'genres': ['Jazz', 'Folk'], 'image_link': 'https://example.com/hop.jpg',
+    'facebook_link': 'https://www.facebook.com/TheMusicalHop', 'website_link': 'https://example.com',
+    'seeking': 'No', 'seeking_message': '',
+}
+
+ARTIST = {
+    'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA', 'phone': '326-123-5000',
+    'genres': ['Rock n Roll'], 'image_link': 'https://example.com/petals.jpg',
+    'facebook_link': 'https://www.facebook.com/GunsNPetals', 'website_link': 'https://example.com',
+    'seeking': 'No', 'seeking_message': '',
+}
+
+
+def row(model, form):
+    return model(**dict(form, seeking=form['seeking'] == 'Yes'))
+
+
+@pytest.fixture
+def venue(app):
+    with app.app_context():
+        venue = row(Venue, VENUE)
+        db.session.add(venue)
+        area_directory.add_venues([(venue.state, venue.city, 0)])
+        db.session.commit()
+        return venue.id
+
+
+@pytest.fixture
+def artist(app):
+    with app.app_context():
+        artist = row(Artist, ARTIST)
+        db.session.add(artist)
+        db.session.commit()
+        return artist.id
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from app import db, Area, Venue
+from conftest import VENUE, QueryCounter
+
+
+def areas(app):
+    with app.app_context():
+        return dict(((area.state, area.city), (area.num_venues, area.num_upcoming_shows))
+                    for area in db.session.scalars(db.select(Area)))
+
+
+def test_counts_are_added_to_not_recounted(app, client):
+    with app.app_context():
+        # what a concurrent writer committed after this one's snapshot
+        db.session.add(Area(state='CA', city='San Francisco', num_venues=5, num_upcoming_shows=2))
+        db.session.commit()
+    client.post('/venues/create', data=VENUE)
+    assert areas(app) == {('CA', 'San Francisco'): (6, 2)}
+
+
+def test_moving_a_venue_moves_its_upcoming_shows(app, client, venue, artist):
+    client.post('/shows/create', data={
+        'artist_id': artist, 'venue_id': venue,
+        'start_time': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    client.post('/venues/create', data=dict(VENUE, name='Park Square'))
+    assert areas(app) == {('CA', 'San Francisco'): (2, 1)}
+
+    client.post('/venues/%d/edit' % venue, data=dict(VENUE, city='Oakland', version='1'))
+    assert areas(app) == {('CA', 'San Francisco'): (1, 0), ('CA', 'Oakland'): (1, 1)}
+
+    # the last venue of an area takes the area with it
+    client.post('/venues/%d/edit' % venue, data=dict(VENUE, city='San Jose', version='2'))
+    assert areas(app) == {('CA', 'San Francisco'): (1, 0), ('CA', 'San Jose'): (1, 1)}
+
+    client.delete('/venues/%d' % venue)
+    assert areas(app) == {('CA', 'San Francisco'): (1, 0)}
+
+
+def test_edit_in_place_leaves_the_areas_alone(app, client, venue):
+    with app.app_context(), QueryCounter() as queries:
+        client.post('/venues/%d/edit' % venue, data=dict(VENUE, name='The Hop', version='1'))
+    assert not [statement for statement in queries.statements if 'area' in statement]
+    with app.app_context():
+        assert db.session.get(Venue, venue).name == 'The Hop'
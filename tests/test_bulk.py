@@ -0,0 +1,59 @@
+import csv
+from datetime import datetime, timedelta
+
+import pytest
+
+import bulk
+from app import db, Venue, Artist, Show
+from conftest import VENUE, ARTIST, row
+
+
+@pytest.mark.parametrize('extension', ['csv', 'jsonl'])
+def test_export_imports_back_with_its_ids(app, tmp_path, extension):
+    date = (datetime.now() + timedelta(days=7)).replace(microsecond=0)
+    with app.app_context():
+        # ids that a fresh database would not hand out
+        db.session.add_all([row(Venue, dict(VENUE, id=5)), row(Artist, dict(ARTIST, id=9))])
+        db.session.flush()
+        db.session.add(Show(venue_id=5, artist_id=9, date=date))
+        db.session.commit()
+
+    runner = app.test_cli_runner()
+    kinds = ['venues', 'artists', 'shows']
+    for kind in kinds:
+        result = runner.invoke(args=['data', 'export', kind, str(tmp_path / ('%s.%s' % (kind, extension)))])
+        assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    for kind in kinds:
+        result = runner.invoke(args=['data', 'import', kind, str(tmp_path / ('%s.%s' % (kind, extension)))])
+        assert result.exit_code == 0, result.output
+        assert 'imported 1 %s, rejected 0' % kind in result.output
+
+    with app.app_context():
+        show = db.session.scalars(db.select(Show)).one()
+        assert (show.venue_id, show.artist_id, show.date) == (5, 9, date)
+        assert db.session.get(Venue, 5).name == VENUE['name']
+        assert db.session.get(Venue, 5).upcoming_shows_count == 1
+        assert db.session.get(Artist, 9).upcoming_shows_count == 1
+
+
+def test_copy_buffer_formats_arrays_dates_and_nulls():
+    rows = [{
+        'name': 'Hop, "the" club',
+        'genres': ['Rock n Roll', 'Jazz "fusion"', 'back\\slash'],
+        'date': datetime(2030, 1, 2, 20, 30),
+        'website_link': None,
+        'seeking': False,
+    }, {'name': 'Empty', 'genres': [], 'date': datetime(2030, 1, 3), 'website_link': 'x', 'seeking': True}]
+    columns = ['name', 'genres', 'date', 'website_link', 'seeking']
+
+    buffer = bulk.copy_buffer(columns, rows)
+    assert list(csv.reader(buffer)) == [
+        ['Hop, "the" club', '{"Rock n Roll","Jazz \\"fusion\\"","back\\\\slash"}', '2030-01-02T20:30:00', '',
+         'False'],
+        ['Empty', '{}', '2030-01-03T00:00:00', 'x', 'True'],
+    ]
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app import db, Show, show_calendar, show_listing
+
+
+@pytest.mark.parametrize('bucket', ['day', 'week'])
+def test_calendar_orders_by_its_groups_only(app, monkeypatch, bucket):
+    # every column in ORDER BY has to be grouped on PostgreSQL
+    dialect = postgresql.dialect()
+    with app.app_context():
+        monkeypatch.setattr(db.session, 'get_bind', lambda *args, **kwargs: SimpleNamespace(dialect=dialect))
+        statement = show_calendar(show_listing().where(Show.date >= datetime.now()), bucket)
+        sql = str(statement.compile(dialect=dialect))
+    assert 'date_trunc' in sql
+    assert sql.rsplit(' ORDER BY ', 1)[1] == 'start'
+
+
+def test_calendar_counts_shows_per_day(app, client, venue, artist):
+    day = (datetime.now() + timedelta(days=3)).replace(hour=20, minute=0, second=0, microsecond=0)
+    with app.app_context():
+        db.session.add_all([
+            Show(venue_id=venue, artist_id=artist, date=day),
+            Show(venue_id=venue, artist_id=artist, date=day + timedelta(hours=2)),
+            Show(venue_id=venue, artist_id=artist, date=day + timedelta(days=1)),
+        ])
+        db.session.commit()
+    response = client.get('/api/v1/shows/calendar')
+    assert response.status_code == 200
+    assert response.json['data'] == [
+        {'start': day.date().isoformat(), 'count': 2},
+        {'start': (day + timedelta(days=1)).date().isoformat(), 'count': 1},
+    ]
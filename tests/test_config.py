@@ -0,0 +1,13 @@
+import importlib
+
+import config
+
+
+def test_secret_key_is_shared_through_the_environment(monkeypatch):
+    # every worker signs the CSRF tokens with the same key
+    monkeypatch.setenv('SECRET_KEY', 'shared by the workers')
+    try:
+        assert importlib.reload(config).SECRET_KEY == 'shared by the workers'
+    finally:
+        monkeypatch.undo()
+        importlib.reload(config)
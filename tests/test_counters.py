@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from app import db, Venue, Artist, show_counters
+
+
+def post_show(client, artist, venue, start_time):
+    return client.post('/shows/create', data={
+        'artist_id': artist, 'venue_id': venue, 'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+
+def test_past_show_counts_as_past_without_a_state_row(app, client, venue, artist):
+    # create_all() leaves the counter state empty
+    response = post_show(client, artist, venue, datetime.now() - timedelta(days=3))
+    assert b'Show was successfully listed!' in response.data
+    with app.app_context():
+        listed = db.session.get(Venue, venue)
+        assert (listed.upcoming_shows_count, listed.past_shows_count) == (0, 1)
+        assert show_counters.check() == []
+
+
+def test_check_reports_shows_started_since_the_rollover(app, client, venue, artist):
+    start = datetime.now() + timedelta(hours=1)
+    post_show(client, artist, venue, start)
+    with app.app_context():
+        assert show_counters.check() == []
+        later = start + timedelta(minutes=1)
+        assert [(table, id) for table, id, *counts in show_counters.check(later)] == \
+            [('venue', venue), ('artist', artist)]
+        show_counters.rollover(later)
+        assert show_counters.check(later) == []
+        assert db.session.get(Artist, artist).past_shows_count == 1
@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta
+
+from app import cache, search, Artist
+from cache import MemoryBackend
+
+
+def test_venue_delete_refreshes_artist_search(app, client, monkeypatch, venue, artist):
+    monkeypatch.setattr(cache, 'backend', MemoryBackend())
+    client.post('/shows/create', data={
+        'artist_id': artist, 'venue_id': venue,
+        'start_time': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    with app.app_context():
+        assert [row.num_upcoming_shows for row in search(Artist, 'Petals')] == [1]
+
+    # the cascade takes the show out of the artist's counters too
+    assert client.delete('/venues/%d' % venue).json['success']
+    with app.app_context():
+        assert [row.num_upcoming_shows for row in search(Artist, 'Petals')] == [0]
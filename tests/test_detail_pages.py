@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, Show
+from conftest import QueryCounter
+
+MAX_QUERIES = 2
+
+
+@pytest.mark.parametrize('num_shows', [1, 50])
+@pytest.mark.parametrize('page', ['/venues/%(venue)d', '/artists/%(artist)d'])
+def test_detail_page_queries(app, client, venue, artist, page, num_shows):
+    # the page and its shows with their counterparts, however many shows
+    now = datetime.now()
+    with app.app_context():
+        db.session.add_all([
+            Show(venue_id=venue, artist_id=artist, date=now + timedelta(days=i - num_shows // 2))
+            for i in range(num_shows)
+        ])
+        db.session.commit()
+
+        with QueryCounter() as queries:
+            response = client.get(page % {'venue': venue, 'artist': artist})
+
+    assert response.status_code == 200
+    assert queries.count <= MAX_QUERIES, queries.statements
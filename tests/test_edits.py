@@ -0,0 +1,34 @@
+from app import db, Venue, Artist
+from conftest import VENUE, ARTIST
+
+
+def version_of(app, model, id):
+    with app.app_context():
+        return db.session.get(model, id).version
+
+
+def test_current_version_is_saved(app, client, venue):
+    response = client.post('/venues/%d/edit' % venue, data=dict(VENUE, name='The Hop', version='1'))
+    assert response.location.endswith('/venues/%d' % venue)
+    with app.app_context():
+        saved = db.session.get(Venue, venue)
+        assert (saved.name, saved.version) == ('The Hop', 2)
+
+
+def test_stale_version_is_rejected(app, client, venue):
+    client.post('/venues/%d/edit' % venue, data=dict(VENUE, name='First edit', version='1'))
+    # filled from version 1 too, but the first edit already moved it to 2
+    response = client.post('/venues/%d/edit' % venue, data=dict(VENUE, name='Second edit', version='1'))
+    assert response.location.endswith('/venues/%d/edit' % venue)
+    with app.app_context():
+        saved = db.session.get(Venue, venue)
+        assert (saved.name, saved.version) == ('First edit', 2)
+
+
+def test_artist_edits_are_versioned(app, client, artist):
+    client.post('/artists/%d/edit' % artist, data=dict(ARTIST, name='Petals', version='1'))
+    response = client.post('/artists/%d/edit' % artist, data=dict(ARTIST, name='Guns', version='1'))
+    assert response.location.endswith('/artists/%d/edit' % artist)
+    with app.app_context():
+        saved = db.session.get(Artist, artist)
+        assert (saved.name, saved.version) == ('Petals', 2)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, Venue, Artist, Show, venue_areas, area_page, area_venues, venue_shows, artist_shows, \
+    shows_page, show_listing, show_calendar, search, has_genre
+from conftest import QueryCounter
+
+# (description, callable issuing the query, index its plan must use, the only
+# dialect it applies to); name search and genre filters use each backend's
+# own index
+HOT_QUERIES = [
+    ('venue areas', lambda: db.session.execute(venue_areas()).all(), 'ix_venue_state_city', None),
+    ('area venues', lambda: db.session.execute(area_venues(('CA', 'A'), ('NY', 'Z'))).all(),
+     'ix_venue_state_city', None),
+    ('venue detail shows', lambda: db.session.execute(venue_shows(1)).all(), 'ix_show_venue_id_date', None),
+    ('artist detail shows', lambda: db.session.execute(artist_shows(1)).all(), 'ix_show_artist_id_date', None),
+    ('shows page', lambda: db.session.execute(shows_page((datetime.now(), 0))).all(), 'ix_show_date', None),
+    ('calendar window', lambda: db.session.execute(show_calendar(
+        show_listing().where(Show.date >= datetime.now(), Show.date < datetime.now() + timedelta(days=31)), 'day'
+    )).all(), 'ix_show_date', None),
+    ('venue search', lambda: search(Venue, 'Venue'), 'venue_fts', 'sqlite'),
+    ('artist search', lambda: search(Artist, 'Artist'), 'artist_fts', 'sqlite'),
+    ('area page', lambda: db.session.execute(area_page(('CA', 'A'))).all(), 'sqlite_autoindex_area_1', 'sqlite'),
+    ('venue search', lambda: search(Venue, 'Venue'), 'ix_venue_name_trgm', 'postgresql'),
+    ('artist search', lambda: search(Artist, 'Artist'), 'ix_artist_name_trgm', 'postgresql'),
+    ('area page', lambda: db.session.execute(area_page(('CA', 'A'))).all(), 'area_pkey', 'postgresql'),
+    ('venue genre filter', lambda: Venue.query.filter(has_genre(Venue, 'Jazz')).all(), 'ix_venue_genres',
+     'postgresql'),
+    ('artist genre filter', lambda: Artist.query.filter(has_genre(Artist, 'Jazz')).all(), 'ix_artist_genres',
+     'postgresql'),
+]
+
+
+def seed():
+    now = datetime.now()
+    for i in range(20):
+        db.session.add_all([
+            Venue(name='Venue %d' % i, genres=['Jazz'], city='San Francisco', state='CA', address='1 Main St',
+                  phone='123-123-1234', image_link='https://example.com/v.jpg'),
+            Artist(name='Artist %d' % i, genres=['Jazz'], city='San Francisco', state='CA',
+                   phone='123-123-1234', image_link='https://example.com/a.jpg'),
+        ])
+    db.session.flush()
+    db.session.add_all([
+        Show(venue_id=i % 20 + 1, artist_id=i % 7 + 1, date=now + timedelta(days=i - 100))
+        for i in range(200)
+    ])
+    db.session.commit()
+
+
+def explain(statement, parameters):
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # tiny tables make sequential scans cheapest; make the planner show
+        # which index it would pick once the tables are large
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+    else:
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+@pytest.mark.parametrize('name, run, index, dialect', HOT_QUERIES, ids=[
+    '%s-%s' % (name, dialect or 'any') for name, _, _, dialect in HOT_QUERIES
+])
+def test_hot_query_uses_index(app, name, run, index, dialect):
+    with app.app_context():
+        if dialect not in (None, db.engine.dialect.name):
+            pytest.skip('planned with %s indexes' % dialect)
+        seed()
+        with QueryCounter() as queries:
+            run()
+
+        plan = explain(queries.statements[-1], queries.parameters[-1])
+        assert index in plan, '%s does not use %s:\n%s' % (name, index, plan)
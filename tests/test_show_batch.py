@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from app import db, Venue, Artist, Show, Area
+
+
+def test_batch_lists_every_show(app, client, venue, artist):
+    start = (datetime.now() + timedelta(days=7)).replace(second=0, microsecond=0)
+    lines = ['%d, %d, %s' % (artist, venue, (start + timedelta(days=day)).strftime('%Y-%m-%d %H:%M'))
+             for day in range(3)]
+    response = client.post('/shows/batch', data={'shows': '\n'.join(lines)})
+    assert response.status_code == 200
+    assert b'3 shows were successfully listed!' in response.data
+    with app.app_context():
+        shows = db.session.scalars(db.select(Show).order_by(Show.date)).all()
+        assert [(show.artist_id, show.venue_id, show.date) for show in shows] == \
+            [(artist, venue, start + timedelta(days=day)) for day in range(3)]
+        assert db.session.get(Venue, venue).upcoming_shows_count == 3
+        assert db.session.get(Artist, artist).upcoming_shows_count == 3
+        assert db.session.scalar(db.select(Area.num_upcoming_shows)) == 3
+
+
+def test_batch_with_an_error_lists_nothing(app, client, venue, artist):
+    start = datetime.now() + timedelta(days=7)
+    lines = ['%d, %d, %s' % (artist, venue, start.strftime('%Y-%m-%d %H:%M')),
+             '%d, %d, %s' % (artist, venue + 1, start.strftime('%Y-%m-%d %H:%M'))]
+    response = client.post('/shows/batch', data={'shows': '\n'.join(lines)})
+    assert b'line 2: unknown venue_id' in response.data
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Show)) == 0
+        assert db.session.get(Venue, venue).upcoming_shows_count == 0